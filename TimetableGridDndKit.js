@@ -114,6 +114,7 @@ export default function TimetableGridDndKit({ scheduleOutput = [] }) {
       return;
     }
 
+    const previousTimetable = timetable;
     setTimetable((prev) => {
       const updatedPrev = { ...prev };
       const newActiveCourses = updatedPrev[activeSlotId].filter(c => c.id !== activeCourseId);
@@ -137,10 +138,17 @@ export default function TimetableGridDndKit({ scheduleOutput = [] }) {
       });
 
       if (!response.ok) {
-        throw new Error('Failed to save changes to the backend.');
+        // The server also checks student clashes and other departments' rooms
+        const data = await response.json().catch(() => ({}));
+        const conflicts = data.detail && data.detail.conflicts;
+        if (conflicts && conflicts.length) {
+          throw new Error(`Conflict: ${conflicts.map((c) => c.type).join(', ')} clash at ${conflicts[0].day} ${conflicts[0].time}.`);
+        }
+        throw new Error((typeof data.detail === 'string' && data.detail) || 'Failed to save changes to the backend.');
       }
       setMessage({ text: 'Changes saved successfully!', type: 'success' });
     } catch (err) {
+      setTimetable(previousTimetable);
       setMessage({ text: err.message, type: 'error' });
     }
 
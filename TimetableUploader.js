@@ -7,6 +7,7 @@ export default function TimetableUploader({ setDeptSchedules }) {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
   const [file, setFile] = useState(null);
+  const [progress, setProgress] = useState(null);
 
   const handleFileChange = (e) => {
     setFile(e.target.files[0]);
@@ -35,14 +36,38 @@ export default function TimetableUploader({ setDeptSchedules }) {
 
       if (!response.ok) {
         const data = await response.json();
-        throw new Error(data.detail || `Upload failed: ${response.statusText}`);
+        throw new Error(data.detail || data.error || `Upload failed: ${response.statusText}`);
       }
 
-      const data = await response.json();
+      // The timetable is generated in a background job; follow its progress stream until it ends
+      const { job_id: jobId } = await response.json();
+      const summary = await new Promise((resolve, reject) => {
+        const events = new EventSource(`http://localhost:8000/jobs/${jobId}/events`);
+        events.addEventListener('generation', (e) => setProgress(JSON.parse(e.data)));
+        events.addEventListener('end', (e) => {
+          events.close();
+          resolve(JSON.parse(e.data));
+        });
+        events.onerror = () => {
+          events.close();
+          reject(new Error('Lost connection to the scheduling job'));
+        };
+      });
+      if (summary.status !== 'completed') {
+        throw new Error(summary.error || `Scheduling job ${summary.status}`);
+      }
+
+      const result = await fetch(`http://localhost:8000/jobs/${jobId}/result`);
+      if (!result.ok) {
+        const data = await result.json();
+        throw new Error(data.detail || `Failed to fetch timetable: ${result.statusText}`);
+      }
+      const data = await result.json();
       setDeptSchedules(data);
     } catch (err) {
       setError(err.message);
     }
+    setProgress(null);
     setLoading(false);
   };
 
@@ -70,6 +95,12 @@ export default function TimetableUploader({ setDeptSchedules }) {
           {loading ? <CircularProgress size={24} /> : 'Upload & Generate Timetable'}
         </Button>
 
+        {progress && (
+          <Typography variant="body2" sx={{ mt: 1, textAlign: 'center' }}>
+            {progress.dept}: generation {progress.generation}, best score {progress.best_score}
+          </Typography>
+        )}
+
         {error && (
           <Typography color="error" variant="body2" sx={{ mt: 2, textAlign: 'center' }}>
             {error}
@@ -1,279 +1,212 @@
-import zipfile
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse, FileResponse
-from fastapi.middleware.cors import CORSMiddleware
-import pandas as pd
-import tempfile
-import shutil
-import os
-from collections import defaultdict
-import random
-from auth import router as auth_router
-from substitute_management import router as substitute_router
-from user_management import router as user_router
-
-app = FastAPI()
-
-app.include_router(auth_router)
-app.include_router(substitute_router)
-app.include_router(user_router)
-
-origins = ["http://localhost:3000"]
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-POPULATION_SIZE = 100
-GENERATIONS = 50
-MUTATION_RATE = 0.15
-
-def ga_scheduler_for_department(
-    dept_code,
-    courses_df,
-    rooms_df,
-    timeslots_df,
-    professors_df,
-    prof_avail_df,
-    students_df,
-    enrollments_df,
-    course_pref_df,
-):
-    dept_courses = courses_df[courses_df['dept_code'] == dept_code].reset_index(drop=True)
-    dept_professors = professors_df[professors_df['dept_code'] == dept_code].reset_index(drop=True)
-    dept_students = students_df[students_df['dept_code'] == dept_code]['student_id'].tolist()
-    dept_enrollments = enrollments_df[enrollments_df['student_id'].isin(dept_students)]
-
-    course_dept = dept_courses.set_index('course_id')['dept_code'].to_dict()
-    professors_by_dept = dept_professors['professor_id'].tolist()
-    prof_avail_map = prof_avail_df[prof_avail_df['available'] == 1]
-    prof_avail_map = prof_avail_map[prof_avail_map['professor_id'].isin(professors_by_dept)]
-    prof_avail_map = prof_avail_map.groupby('professor_id')['timeslot_id'].apply(set).to_dict()
-
-    course_profs = {cid: professors_by_dept for cid in dept_courses['course_id']}
-
-    room_cap = rooms_df.set_index('room_id')['capacity'].to_dict()
-    room_type = rooms_df.set_index('room_id')['room_type'].to_dict()
-    course_roomreq = dept_courses.set_index('course_id')['required_room_type'].to_dict()
-
-    course_students = dept_enrollments.groupby('course_id')['student_id'].apply(set).to_dict()
-    student_course_map = dept_enrollments.groupby('student_id')['course_id'].apply(set).to_dict()
-    course_pref_map = course_pref_df[course_pref_df['course_id'].isin(dept_courses['course_id'])]
-    course_pref_map = course_pref_map.groupby('course_id')['timeslot_id'].apply(set).to_dict()
-
-    def create_individual():
-        individual = []
-        for _, course in dept_courses.iterrows():
-            cid = course['course_id']
-            timeslot = random.choice(timeslots_df['timeslot_id'])
-            possible_rooms = [
-                r for r in rooms_df['room_id']
-                if room_type[r] == course_roomreq.get(cid, 'Lecture') and room_cap[r] >= 30
-            ]
-            if not possible_rooms:
-                possible_rooms = rooms_df['room_id'].tolist()
-            room = random.choice(possible_rooms)
-            prof_list = course_profs.get(cid, [])
-            prof = random.choice(prof_list) if prof_list else None
-            individual.append((cid, timeslot, room, prof))
-        return individual
-
-    def fitness(individual):
-        score = 0
-        used_room_time = set()
-        prof_time = defaultdict(set)
-        prof_load = defaultdict(int)
-        student_time_courses = defaultdict(set)
-
-        for gene in individual:
-            cid, ts, room, prof = gene
-
-            if room_cap[room] < 30 or room_type[room] != course_roomreq.get(cid, 'Lecture'):
-                score -= 5
-            else:
-                score += 1
-
-            if (room, ts) in used_room_time:
-                score -= 10
-            else:
-                used_room_time.add((room, ts))
-                score += 2
-
-            if prof is not None:
-                if ts not in prof_avail_map.get(prof, set()):
-                    score -= 10
-                if ts in prof_time[prof]:
-                    score -= 15
-                prof_time[prof].add(ts)
-                prof_load[prof] += 1
-                score += 2
-            else:
-                score -= 5
-
-            students = course_students.get(cid, set())
-            for stu in students:
-                if ts in student_time_courses[stu]:
-                    score -= 15
-                else:
-                    student_time_courses[stu].add(ts)
-
-            if ts in course_pref_map.get(cid, set()):
-                score += 3
-
-        for prof, load in prof_load.items():
-            max_load = dept_professors.loc[dept_professors['professor_id'] == prof, 'max_load_per_week'].values[0]
-            if load > max_load:
-                score -= (load - max_load) * 10
-        return score
-
-    def selection(population):
-        population.sort(key=fitness, reverse=True)
-        return population[:int(0.2 * len(population))]
-
-    def crossover(p1, p2):
-        point = random.randint(1, len(p1) - 1)
-        return p1[:point] + p2[point:]
-
-    def mutate(individual):
-        for i in range(len(individual)):
-            if random.random() < MUTATION_RATE:
-                cid, _, _, _ = individual[i]
-                timeslot = random.choice(timeslots_df['timeslot_id'])
-
-                possible_rooms = [
-                    r for r in rooms_df['room_id']
-                    if room_type[r] == course_roomreq.get(cid, 'Lecture') and room_cap[r] >= 30
-                ]
-                if not possible_rooms:
-                    possible_rooms = rooms_df['room_id'].tolist()
-                room = random.choice(possible_rooms)
-
-                prof_list = course_profs.get(cid, [])
-                prof = random.choice(prof_list) if prof_list else None
-                individual[i] = (cid, timeslot, room, prof)
-        return individual
-
-    def genetic_algorithm():
-        population = [create_individual() for _ in range(POPULATION_SIZE)]
-        best = None
-        best_score = float('-inf')
-        for gen in range(GENERATIONS):
-            selected = selection(population)
-            next_pop = selected[:]
-            while len(next_pop) < POPULATION_SIZE:
-                p1, p2 = random.sample(selected, 2)
-                child = crossover(p1, p2)
-                child = mutate(child)
-                next_pop.append(child)
-            population = next_pop
-            current_best = max(population, key=fitness)
-            current_score = fitness(current_best)
-            print(f"[{dept_code}] Gen {gen + 1}, Best Score: {current_score}")
-            if current_score > best_score:
-                best = current_best
-                best_score = current_score
-        return best
-
-    def prepare_output(schedule):
-        timetable = []
-        for gene in schedule:
-            cid, ts, room, prof = gene
-            course_name = dept_courses.loc[dept_courses['course_id'] == cid, 'course_name'].values[0]
-            room_name = rooms_df.loc[rooms_df['room_id'] == room, 'room_name'].values[0]
-            prof_name = (dept_professors.loc[dept_professors['professor_id'] == prof, 'name'].values[0]
-                         if prof is not None else "NA")
-            day = timeslots_df.loc[timeslots_df['timeslot_id'] == ts, 'day'].values[0]
-            start_time = timeslots_df.loc[timeslots_df['timeslot_id'] == ts, 'start_time'].values[0]
-            timetable.append({
-                "day": day,
-                "time": start_time,
-                "id": cid,
-                "name": course_name,
-                "professor": prof_name,
-                "room": room_name,
-            })
-        return timetable
-
-    best_schedule = genetic_algorithm()
-    return prepare_output(best_schedule)
-
-def run_ga_scheduling(
-    courses_path,
-    rooms_path,
-    timeslots_path,
-    professors_path,
-    prof_avail_path,
-    students_path,
-    enrollments_path,
-    course_pref_path,
-):
-    courses_df = pd.read_csv(courses_path)
-    rooms_df = pd.read_csv(rooms_path)
-    timeslots_df = pd.read_csv(timeslots_path)
-    professors_df = pd.read_csv(professors_path)
-    prof_avail_df = pd.read_csv(prof_avail_path)
-    students_df = pd.read_csv(students_path)
-    enrollments_df = pd.read_csv(enrollments_path)
-    course_pref_df = pd.read_csv(course_pref_path)
-
-    dept_timetables = {}
-
-    for dept in sorted(courses_df['dept_code'].unique()):
-        dept_timetables[dept] = ga_scheduler_for_department(
-            dept,
-            courses_df,
-            rooms_df,
-            timeslots_df,
-            professors_df,
-            prof_avail_df,
-            students_df,
-            enrollments_df,
-            course_pref_df,
-        )
-
-    return dept_timetables
-
-@app.post("/upload")
-async def upload_zip(file: UploadFile = File(...)):
-    if not file.filename.endswith('.zip'):
-        return JSONResponse(content={"error": "Please upload a .zip file"}, status_code=400)
-
-    temp_dir = tempfile.mkdtemp()
-    zip_path = os.path.join(temp_dir, file.filename)
-    try:
-        with open(zip_path, 'wb') as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(temp_dir)
-
-        required_files = ['courses.csv', 'rooms.csv', 'timeslots.csv', 'professors.csv',
-                          'prof_availability.csv', 'students.csv', 'enrollments.csv', 'course_preferred_timeslots.csv']
-
-        file_paths = {}
-        for filename in required_files:
-            path = os.path.join(temp_dir, filename)
-            if not os.path.isfile(path):
-                return JSONResponse(content={"error": f"Missing required file: {filename}"}, status_code=400)
-            file_paths[filename] = path
-
-        schedule = run_ga_scheduling(
-            file_paths['courses.csv'], file_paths['rooms.csv'],
-            file_paths['timeslots.csv'], file_paths['professors.csv'],
-            file_paths['prof_availability.csv'], file_paths['students.csv'],
-            file_paths['enrollments.csv'], file_paths['course_preferred_timeslots.csv']
-        )
-    finally:
-        shutil.rmtree(temp_dir)
-
-    return JSONResponse(content=schedule)
-
-@app.get("/download")
-def download_schedule():
-    file_path = "optimized_timetable.csv"
-    if not os.path.exists(file_path):
-        return JSONResponse(content={"error": "No timetable file available"}, status_code=404)
-    return FileResponse(file_path, media_type="text/csv", filename="optimized_timetable.csv")
+import time
+import zipfile
+from dataclasses import asdict
+from functools import partial
+from fastapi import Depends, FastAPI, File, UploadFile, HTTPException
+from fastapi.responses import JSONResponse, FileResponse
+from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
+import os
+from auth import router as auth_router
+from auth_dependencies import get_current_active_user
+from dataset_loader import TABLES, load_zip
+from dataset_validation import validate_dataset
+from substitute_management import router as substitute_router
+from substitute_recommendation import router as recommendation_router
+from user_management import router as user_router
+from job_management import router as job_router, job_manager
+from telemetry import SamplingProfiler, fan_out, logging_progress, metrics, router as telemetry_router
+from ga_engine import (
+    GENERATIONS,
+    MUTATION_RATE,
+    POPULATION_SIZE,
+    UNCONSTRAINED_SHARE,
+    StoppingCriteria,
+    decode_individual,
+    print_progress,
+)
+from institution_scheduling import ROOM_SHARING, schedule_institution
+from constructive_seeding import SEEDED_FRACTION
+from local_search import LOCAL_SEARCH_TIME
+from rescheduling import RescheduleRequest, apply_changes, dataset_store, reschedule, timetable_bookings
+from result_cache import dataset_key, department_key, result_cache
+from timetable_management import router as timetable_router, timetable_store
+from timetable_output import TimetableFormatter
+
+app = FastAPI()
+
+app.include_router(auth_router)
+app.include_router(substitute_router)
+app.include_router(recommendation_router)
+app.include_router(user_router)
+app.include_router(job_router)
+app.include_router(timetable_router)
+app.include_router(telemetry_router)
+
+origins = ["http://localhost:3000"]
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=origins,
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+GA_WORKERS = 1
+GA_SEED = None
+GA_ISLANDS = 1
+# Memetic repair of each generation's elites: None, 'steepest' or 'tabu'
+GA_LOCAL_SEARCH = None
+# Bounds /upload latency per department and stops converged runs early
+GA_STOPPING = StoppingCriteria(time_budget=120.0, stall_generations=20, stop_when_feasible=False)
+
+def prepare_output(dept_code, schedule, courses_df, rooms_df, timeslots_df, professors_df, formatter=None):
+    # Pass a formatter to reuse its lookups across departments of the same dataset
+    if formatter is None:
+        formatter = TimetableFormatter(courses_df, rooms_df, timeslots_df, professors_df)
+    return formatter.records(schedule)
+
+def run_ga_scheduling(
+    courses_df,
+    rooms_df,
+    timeslots_df,
+    professors_df,
+    prof_avail_df,
+    students_df,
+    enrollments_df,
+    course_pref_df,
+    workers=GA_WORKERS,
+    seed=GA_SEED,
+    islands=GA_ISLANDS,
+    progress=print_progress,
+    cache=result_cache,
+    stopping=GA_STOPPING,
+    room_sharing=ROOM_SHARING,
+    profile=False,
+):
+    frames = (courses_df, rooms_df, timeslots_df, professors_df,
+              prof_avail_df, students_df, enrollments_df, course_pref_df)
+    if profile:
+        # Samples this thread only, so departments sent to worker processes are not covered
+        profiler = SamplingProfiler()
+        try:
+            with profiler:
+                return run_ga_scheduling(*frames, workers=workers, seed=seed, islands=islands, progress=progress,
+                                         cache=cache, stopping=stopping, room_sharing=room_sharing)
+        finally:
+            progress({"type": "profile", "dept": "*", **profiler.report()})
+    progress = fan_out(progress, metrics.record)
+
+    # Keep the inputs so departments can later be rescheduled against changes to them
+    progress({"type": "dataset", "dept": "*", "dataset_id": dataset_store.put(frames)})
+
+    # Anything that changes the GA's output must be part of the cache key
+    params = {
+        "population_size": POPULATION_SIZE,
+        "generations": GENERATIONS,
+        "mutation_rate": MUTATION_RATE,
+        "islands": islands,
+        "seed": seed,
+        "stopping": asdict(stopping),
+        "unconstrained_share": UNCONSTRAINED_SHARE,
+        "local_search": GA_LOCAL_SEARCH,
+        "local_search_time": LOCAL_SEARCH_TIME,
+        "seeded_fraction": SEEDED_FRACTION,
+        "room_sharing": room_sharing,
+    }
+    upload_key = None
+    if cache is not None:
+        upload_key = dataset_key(dict(zip(TABLES, frames)), params)
+        cached = cache.get(upload_key)
+        if cached is not None:
+            progress({"type": "cache", "dept": "*", "status": "hit"})
+            progress({"type": "room_conflicts", "dept": "*", "mode": room_sharing,
+                      "conflicts": cached["conflicts"]})
+            return cached["timetables"]
+
+    def department_cache_key(dept, reserved, stage):
+        # A department's result depends on the rooms other departments had already taken
+        reserved_rooms = sorted((str(room), str(ts)) for room, ts in reserved)
+        return department_key(dept, *frames, {**params, "stage": stage, "reserved_rooms": reserved_rooms})
+
+    # Departments found in the cache are not scheduled again; the rest go to the workers
+    models, results, conflicts = schedule_institution(
+        frames, mode=room_sharing, workers=workers, seed=seed, islands=islands, progress=progress,
+        cache=cache, cache_key=department_cache_key, stopping=stopping, local_search=GA_LOCAL_SEARCH)
+
+    dept_timetables = {}
+    formatter = TimetableFormatter(courses_df, rooms_df, timeslots_df, professors_df)
+    for dept, model in models.items():
+        started = time.perf_counter()
+        schedule = decode_individual(model, results[dept].best)
+        dept_timetables[dept] = prepare_output(
+            dept, schedule, courses_df, rooms_df, timeslots_df, professors_df, formatter,
+        )
+        progress({"type": "timings", "dept": dept, "output": round(time.perf_counter() - started, 6)})
+
+    dept_timetables = {dept: dept_timetables[dept] for dept in sorted(dept_timetables)}
+    if cache is not None:
+        cache.put(upload_key, {"timetables": dept_timetables, "conflicts": conflicts})
+    return dept_timetables
+
+@app.post("/upload", status_code=202)
+async def upload_zip(file: UploadFile = File(...), profile: bool = False):
+    if not file.filename.endswith('.zip'):
+        return JSONResponse(content={"error": "Please upload a .zip file"}, status_code=400)
+
+    # Tables are parsed straight out of the archive, nothing is extracted to disk
+    try:
+        frames, ingest = await run_in_threadpool(load_zip, file.file)
+    except HTTPException as exc:
+        return JSONResponse(content={"error": exc.detail}, status_code=exc.status_code)
+    except zipfile.BadZipFile:
+        return JSONResponse(content={"error": "Uploaded file is not a valid .zip archive"}, status_code=400)
+
+    # Reject broken datasets before any GA work is queued
+    validation = await run_in_threadpool(validate_dataset, frames)
+    if not validation["valid"]:
+        return JSONResponse(content={"error": f"Invalid dataset: {validation['summary']}",
+                                     "validation": validation, "ingest": ingest}, status_code=422)
+
+    # The GA runs on the job pool; the client follows /jobs/{job_id} for progress and the result
+    job = job_manager.submit(partial(run_ga_scheduling, profile=profile), *frames)
+    return JSONResponse(content={"job_id": job.id, "status": job.status, "ingest": ingest,
+                                 "validation": validation}, status_code=202)
+
+def run_reschedule(request):
+    frames = dataset_store.get(request.dataset_id)
+    timetable = request.timetable if request.timetable is not None else timetable_store.get(request.dept_code)
+    if not timetable:
+        raise HTTPException(status_code=404, detail="Timetable not found")
+    frames = apply_changes(frames, request.changes)
+    validation = validate_dataset(frames)
+    if not validation["valid"]:
+        raise HTTPException(status_code=422, detail=validation)
+    courses_df, rooms_df, timeslots_df, professors_df = frames[:4]
+
+    # Rooms used by the other departments' stored timetables stay off limits
+    reserved = set()
+    for dept, other in timetable_store.items():
+        if dept != request.dept_code:
+            reserved |= timetable_bookings(other, rooms_df, timeslots_df)
+    model, result, report = reschedule(request.dept_code, frames, timetable, request.changes,
+                                       churn_penalty=request.churn_penalty, seed=request.seed,
+                                       reserved_rooms=reserved, progress=fan_out(logging_progress, metrics.record))
+    return {
+        "dataset_id": dataset_store.put(frames),
+        "dept_code": request.dept_code,
+        "timetable": prepare_output(request.dept_code, decode_individual(model, result.best),
+                                    courses_df, rooms_df, timeslots_df, professors_df),
+        "report": report,
+    }
+
+@app.post("/reschedule")
+async def reschedule_department(request: RescheduleRequest, current_user: dict = Depends(get_current_active_user)):
+    return await run_in_threadpool(run_reschedule, request)
+
+@app.get("/download")
+def download_schedule():
+    file_path = "optimized_timetable.csv"
+    if not os.path.exists(file_path):
+        return JSONResponse(content={"error": "No timetable file available"}, status_code=404)
+    return FileResponse(file_path, media_type="text/csv", filename="optimized_timetable.csv")
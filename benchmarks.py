@@ -0,0 +1,362 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from data import PRESETS, generate_dataset, write_dataset
+from dataset_loader import TABLES
+from ga_engine import (
+    POPULATION_SIZE,
+    StoppingCriteria,
+    create_individual,
+    decode_individual,
+    evaluate_population,
+    fitness,
+    genetic_algorithm,
+    mutate,
+    selection,
+)
+from institution_scheduling import department_order
+from parallel_scheduling import department_rng
+from problem_model import compile_department
+
+# Dataset sizes, as generate_dataset keyword arguments
+SCALES = {
+    'small': PRESETS['small'],
+    'medium': dict(departments=10, courses_per_dept=25, rooms=60, professors_per_dept=7, students=5_000,
+                   courses_per_student=(3, 5), popularity='zipf', lab_course_share=0.2, lab_share=0.3),
+    'large': PRESETS['large'],
+}
+BENCH_SCALES = ('small', 'medium')
+# Largest departments benchmarked per scale
+BENCH_DEPARTMENTS = 3
+BENCH_GENERATIONS = 30
+BENCH_SEED = 0
+# Wall-clock cap on the run that measures time to the first feasible timetable
+FEASIBLE_TIME_BUDGET = 20.0
+# Generations of the separate, traced run that measures peak memory
+MEMORY_GENERATIONS = 5
+# Scales whose /upload job is awaited; larger ones only time the request and cancel the job
+UPLOAD_END_TO_END = ('small',)
+UPLOAD_TIMEOUT = 600.0
+# Relative change against the baseline beyond which a metric counts as regressed
+REGRESSION_TOLERANCE = 0.15
+
+# Comparable metrics and whether higher or lower is better
+METRICS = {
+    'evaluations_per_second': 'higher',
+    'seconds_per_generation': 'lower',
+    'time_to_feasible': 'lower',
+    'best_score': 'higher',
+    'peak_bytes': 'lower',
+    'compile_seconds': 'lower',
+    'fitness_seconds': 'lower',
+    'batch_fitness_seconds': 'lower',
+    'selection_seconds': 'lower',
+    'mutate_seconds': 'lower',
+    'prepare_output_seconds': 'lower',
+    'response_seconds': 'lower',
+    'job_seconds': 'lower',
+    'cached_job_seconds': 'lower',
+}
+
+
+def _per_call(fn, repeat):
+    """Best-of-three average seconds per call of ``fn`` over ``repeat`` calls."""
+    best = float('inf')
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        best = min(best, (time.perf_counter() - started) / repeat)
+    return best
+
+
+def benchmark_operators(model, frames, seed=BENCH_SEED):
+    """Seconds per call of the GA operators and of ``prepare_output`` on one department."""
+    from app import prepare_output
+
+    rng = department_rng(seed, f"{model.dept_code}:operators")
+    population = [create_individual(model, rng) for _ in range(POPULATION_SIZE)]
+    scores = evaluate_population(model, population)
+    schedule = decode_individual(model, population[0])
+    courses_df, rooms_df, timeslots_df, professors_df = frames[:4]
+    return {
+        "fitness_seconds": _per_call(lambda: fitness(model, population[0]), 50),
+        "batch_fitness_seconds": _per_call(lambda: evaluate_population(model, population), 5) / POPULATION_SIZE,
+        "selection_seconds": _per_call(lambda: selection(model, population, scores), 50),
+        "mutate_seconds": _per_call(lambda: mutate(model, list(population[0]), rng=rng), 200),
+        "prepare_output_seconds": _per_call(
+            lambda: prepare_output(model.dept_code, schedule, courses_df, rooms_df, timeslots_df, professors_df), 3),
+    }
+
+
+def benchmark_department(dept, frames, generations=BENCH_GENERATIONS, seed=BENCH_SEED):
+    """Throughput, convergence, time to feasibility and peak memory of the GA on one department."""
+    started = time.perf_counter()
+    model = compile_department(dept, *frames)
+    compile_seconds = time.perf_counter() - started
+
+    events = []
+    started = time.perf_counter()
+
+    def record(event):
+        events.append((time.perf_counter() - started, event))
+
+    result = genetic_algorithm(model, generations=generations, rng=department_rng(seed, dept), progress=record)
+    elapsed = time.perf_counter() - started
+    evaluations = next(e['evaluations'] for _, e in events if e['type'] == 'evaluations')
+    trajectory, best = [], float('-inf')
+    for at, event in events:
+        if event['type'] == 'generation':
+            best = max(best, event['best_score'])
+            trajectory.append([round(at, 4), best])
+
+    feasible = genetic_algorithm(
+        model, generations=sys.maxsize, rng=department_rng(seed, f"{dept}:feasible"), progress=lambda e: None,
+        stopping=StoppingCriteria(time_budget=FEASIBLE_TIME_BUDGET, stop_when_feasible=True))
+
+    tracemalloc.start()
+    try:
+        compile_department(dept, *frames)
+        genetic_algorithm(model, generations=MEMORY_GENERATIONS, rng=department_rng(seed, dept),
+                          progress=lambda e: None)
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "courses": model.n_courses,
+        "students": model.n_students,
+        "compile_seconds": compile_seconds,
+        "generations": result.generations,
+        "seconds": elapsed,
+        "seconds_per_generation": elapsed / max(result.generations, 1),
+        "evaluations": evaluations,
+        "evaluations_per_second": evaluations / elapsed,
+        "best_score": result.best_score,
+        "hard_violations": result.hard_violations,
+        "time_to_feasible": feasible.elapsed if feasible.stop_reason == 'feasible' else None,
+        "peak_bytes": peak_bytes,
+        "trajectory": trajectory,
+        "operators": benchmark_operators(model, frames, seed),
+    }
+
+
+@contextmanager
+def _temporary_stores(directory):
+    """Point the app's result cache and SQLite-backed stores into ``directory`` for the duration."""
+    from rescheduling import DATASET_DB_PATH, dataset_store
+    from result_cache import result_cache
+    from substitute_management import SUBSTITUTION_DB_PATH, substitution_store
+    from timetable_management import TIMETABLE_DB_PATH, timetable_store
+
+    stores = ((dataset_store, DATASET_DB_PATH), (timetable_store, TIMETABLE_DB_PATH),
+              (substitution_store, SUBSTITUTION_DB_PATH))
+    saved = [dict(vars(store)) for store, _ in stores]
+    cache_directory = result_cache.directory
+    try:
+        result_cache.directory = os.path.join(directory, 'cache')
+        for store, path in stores:
+            store.__init__(os.path.join(directory, os.path.basename(path)))
+        yield
+    finally:
+        result_cache.directory = cache_directory
+        for (store, _), state in zip(stores, saved):
+            vars(store).clear()
+            vars(store).update(state)
+
+
+def benchmark_upload(frames, wait=True):
+    """``/upload`` latency through an in-process test client.
+
+    ``response_seconds`` covers parsing, validation and queueing the job.
+    With ``wait`` the job is followed to completion (``job_seconds``) and
+    the same archive is uploaded again to time a result cache hit
+    (``cached_job_seconds``); otherwise the job is cancelled. A temporary
+    result cache directory keeps earlier runs from being served, and
+    temporary databases keep the benchmark's datasets out of the real ones.
+    """
+    from fastapi.testclient import TestClient
+
+    import app
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'dataset.zip')
+        write_dataset(frames, path, 'zip')
+        with open(path, 'rb') as f:
+            archive = f.read()
+
+        with _temporary_stores(tmp):
+            client = TestClient(app.app)
+            report = {"archive_bytes": len(archive)}
+            for key in ('job_seconds', 'cached_job_seconds') if wait else ('job_seconds',):
+                started = time.perf_counter()
+                response = client.post('/upload', files={'file': ('dataset.zip', archive, 'application/zip')})
+                if response.status_code != 202:
+                    raise RuntimeError(f"/upload returned {response.status_code}: {response.text}")
+                report.setdefault("response_seconds", time.perf_counter() - started)
+                job_id = response.json()['job_id']
+                if not wait:
+                    client.delete(f'/jobs/{job_id}')
+                    break
+                while True:
+                    job = client.get(f'/jobs/{job_id}').json()
+                    if job['status'] in ('completed', 'failed', 'cancelled'):
+                        break
+                    if time.perf_counter() - started > UPLOAD_TIMEOUT:
+                        client.delete(f'/jobs/{job_id}')
+                        raise RuntimeError(f"/upload job did not finish within {UPLOAD_TIMEOUT}s")
+                    time.sleep(0.05)
+                if job['status'] != 'completed':
+                    raise RuntimeError(f"/upload job {job['status']}: {job['error']}")
+                report[key] = time.perf_counter() - started
+    return report
+
+
+def _overall(departments):
+    runs = list(departments.values())
+    seconds = sum(r['seconds'] for r in runs)
+    feasible = [r['time_to_feasible'] for r in runs]
+    return {
+        "evaluations_per_second": sum(r['evaluations'] for r in runs) / seconds,
+        "seconds_per_generation": seconds / max(sum(r['generations'] for r in runs), 1),
+        "time_to_feasible": None if None in feasible else max(feasible),
+        "best_score": sum(r['best_score'] for r in runs),
+        "peak_bytes": max(r['peak_bytes'] for r in runs),
+        "compile_seconds": sum(r['compile_seconds'] for r in runs),
+    }
+
+
+def run_benchmarks(scales=BENCH_SCALES, departments=BENCH_DEPARTMENTS, generations=BENCH_GENERATIONS,
+                   seed=BENCH_SEED, upload=True, log=print):
+    """Benchmark every scale and return the machine-readable results."""
+    results = {
+        "created_at": time.time(),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "settings": {"departments": departments, "generations": generations, "seed": seed,
+                     "population_size": POPULATION_SIZE},
+        "scales": {},
+    }
+    for scale in scales:
+        frames = generate_dataset(seed=seed, **SCALES[scale])
+        depts = {}
+        for dept in department_order(frames[0])[:departments]:
+            depts[str(dept)] = benchmark_department(dept, frames, generations, seed)
+            run = depts[str(dept)]
+            feasible = run['time_to_feasible']
+            log(f"[{scale}/{dept}] {run['evaluations_per_second']:.0f} evaluations/s, "
+                f"{run['seconds_per_generation'] * 1000:.1f} ms/generation, best score {run['best_score']}, "
+                f"feasible after {'-' if feasible is None else f'{feasible:.2f}s'}, "
+                f"peak {run['peak_bytes'] / 2 ** 20:.1f} MiB")
+        results["scales"][scale] = {
+            "rows": {table: len(df) for table, df in zip(TABLES, frames)},
+            "departments": depts,
+            "overall": _overall(depts),
+        }
+        if upload:
+            report = benchmark_upload(frames, wait=scale in UPLOAD_END_TO_END)
+            results["scales"][scale]["upload"] = report
+            log(f"[{scale}] /upload responded in {report['response_seconds']:.3f}s"
+                + (f", job done in {report['job_seconds']:.2f}s" if 'job_seconds' in report else ""))
+    return results
+
+
+def _metrics(results):
+    """``{path: value}`` for every comparable metric in a results dict."""
+    found = {}
+
+    def walk(node, path):
+        for key, value in node.items():
+            if isinstance(value, dict):
+                walk(value, path + (key,))
+            elif key in METRICS:
+                found['.'.join(path + (key,))] = value
+
+    walk(results.get("scales", {}), ())
+    return found
+
+
+def compare(results, baseline, tolerance=REGRESSION_TOLERANCE):
+    """Compare results with a baseline run, flagging metrics worse by more than ``tolerance``."""
+    current, previous = _metrics(results), _metrics(baseline)
+    # Overall figures only compare when both runs benchmarked the same departments
+    for scale, run in results.get("scales", {}).items():
+        other = baseline.get("scales", {}).get(scale, {})
+        if run["departments"].keys() != other.get("departments", {}).keys():
+            for path in [path for path in current if path.startswith(f"{scale}.overall.")]:
+                del current[path]
+    regressions, improvements = [], []
+    for path in sorted(current.keys() & previous.keys()):
+        new, old = current[path], previous[path]
+        higher = METRICS[path.rsplit('.', 1)[1]] == 'higher'
+        entry = {"metric": path, "baseline": old, "current": new}
+        if old is None or new is None:
+            # Becoming infeasible is a regression, becoming feasible an improvement
+            if (old is None) != (new is None):
+                (regressions if new is None else improvements).append(entry)
+            continue
+        if old == 0:
+            continue
+        change = (new - old) / abs(old)
+        entry["change"] = round(change, 4)
+        if (-change if higher else change) > tolerance:
+            regressions.append(entry)
+        elif (change if higher else -change) > tolerance:
+            improvements.append(entry)
+    return {"tolerance": tolerance, "compared": len(current.keys() & previous.keys()),
+            "regressions": regressions, "improvements": improvements}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the scheduler and the /upload endpoint.")
+    parser.add_argument("--scales", nargs='+', choices=SCALES, default=list(BENCH_SCALES),
+                        help="generated dataset sizes to benchmark")
+    parser.add_argument("--departments", type=int, default=BENCH_DEPARTMENTS,
+                        help="largest departments benchmarked per scale")
+    parser.add_argument("--generations", type=int, default=BENCH_GENERATIONS,
+                        help="generations per throughput run")
+    parser.add_argument("--seed", type=int, default=BENCH_SEED, help="seed for the datasets and GA runs")
+    parser.add_argument("--no-upload", action="store_true", help="skip the /upload latency benchmark")
+    parser.add_argument("--output", default=None, help="write the JSON results here instead of stdout")
+    parser.add_argument("--baseline", default=None,
+                        help="JSON results of an earlier run; exits with status 1 if any metric regressed")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE,
+                        help="relative change counted as a regression")
+    args = parser.parse_args()
+
+    def log(message):
+        print(message, file=sys.stderr)
+
+    results = run_benchmarks(args.scales, args.departments, args.generations, args.seed,
+                             upload=not args.no_upload, log=log)
+    if args.baseline:
+        with open(args.baseline) as f:
+            results["comparison"] = compare(results, json.load(f), args.tolerance)
+        for entry in results["comparison"]["regressions"]:
+            log(f"REGRESSION {entry['metric']}: {entry['baseline']} -> {entry['current']}")
+        log(f"{len(results['comparison']['regressions'])} regressions, "
+            f"{len(results['comparison']['improvements'])} improvements "
+            f"in {results['comparison']['compared']} metrics")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    if args.baseline and results["comparison"]["regressions"]:
+        sys.exit(1)
@@ -0,0 +1,93 @@
+import random
+
+from problem_model import NO_PROFESSOR, _bits
+
+# Share of the initial population built by DSatur instead of drawn at random
+SEEDED_FRACTION = 0.2
+
+
+def _pick_room(model, c, ts, room_busy, rng):
+    """A random room from course ``c``'s domain that is free in ``ts``, or None."""
+    rooms = model.candidate_rooms[c]
+    offset = rng.randrange(len(rooms))
+    busy = room_busy[ts]
+    for i in range(len(rooms)):
+        room = rooms[(offset + i) % len(rooms)]
+        if not busy >> room & 1:
+            return room
+    return None
+
+
+def _pick_prof(model, ts, prof_busy, prof_load, rng):
+    """A random professor available and free in ``ts`` with load to spare, or None."""
+    profs = model.candidate_profs
+    if not profs:
+        return None
+    offset = rng.randrange(len(profs))
+    busy = prof_busy[ts]
+    bit = 1 << ts
+    for i in range(len(profs)):
+        prof = profs[(offset + i) % len(profs)]
+        if (model.prof_avail_bits[prof] & bit and not busy >> prof & 1
+                and prof_load[prof] < model.max_load[prof]):
+            return prof
+    return None
+
+
+def dsatur_individual(model, rng=random):
+    """Build one timetable greedily with DSatur colouring of the course-conflict graph.
+
+    Timeslots are the colours. The next course is always the uncoloured one
+    whose conflict-graph neighbours already use the most distinct
+    timeslots (ties broken by shared-student weight, then at random). It
+    goes to the timeslot with the fewest clashing students, where a free
+    suitable room and a free available professor with load to spare are
+    preferred, as are the course's preferred timeslots. Random tie-breaks
+    make every call return a different timetable.
+    """
+    n_courses, n_timeslots = model.n_courses, model.n_timeslots
+    neighbors = model.conflict_neighbors
+    weight = [sum(n.values()) for n in neighbors]
+    tie = [rng.random() for _ in range(n_courses)]
+    saturation = [set() for _ in range(n_courses)]
+    clash = [[0] * n_timeslots for _ in range(n_courses)]
+    # Rooms booked by other departments start out busy
+    room_busy = [_bits(column) for column in model.room_reserved.T]
+    prof_busy = [0] * n_timeslots
+    prof_load = [0] * model.n_professors
+    genes = [None] * n_courses
+
+    uncoloured = set(range(n_courses))
+    slots = list(range(n_timeslots))
+    while uncoloured:
+        c = max(uncoloured, key=lambda c: (len(saturation[c]), weight[c], tie[c]))
+        uncoloured.remove(c)
+
+        rng.shuffle(slots)
+        best = None
+        for ts in slots:
+            room = _pick_room(model, c, ts, room_busy, rng)
+            prof = _pick_prof(model, ts, prof_busy, prof_load, rng)
+            # Same weights as fitness(): student clashes, double-booked rooms, professor problems, preference
+            cost = 15 * clash[c][ts]
+            cost += 12 if room is None else 0
+            cost += 10 if prof is None else 0
+            cost -= 3 if model.preferred_bits[c] >> ts & 1 else 0
+            if best is None or cost < best[0]:
+                best = (cost, ts, room, prof)
+
+        _, ts, room, prof = best
+        if room is None:
+            room = rng.choice(model.candidate_rooms[c])
+        if prof is None:
+            prof = rng.choice(model.candidate_profs) if model.candidate_profs else NO_PROFESSOR
+        genes[c] = (ts, room, prof)
+
+        room_busy[ts] |= 1 << room
+        if prof != NO_PROFESSOR:
+            prof_busy[ts] |= 1 << prof
+            prof_load[prof] += 1
+        for n, w in neighbors[c].items():
+            clash[n][ts] += w
+            saturation[n].add(ts)
+    return genes
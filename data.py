@@ -1,110 +1,212 @@
-import pandas as pd
-import random
-
-departments = ['CSE', 'ECE', 'ME', 'CE']
-subjects = {
-    'CSE': ['Algorithms', 'Data Structures', 'AI'],
-    'ECE': ['Circuits', 'Signal Processing', 'Microprocessors'],
-    'ME': ['Thermodynamics', 'Fluid Mechanics'],
-    'CE': ['Geotechnical', 'Structural Analysis']
-}
-
-# Courses with dynamic departments
-courses = []
-course_id = 1
-for dept, subs in subjects.items():
-    for sub in subs:
-        courses.append({
-            'course_id': course_id,
-            'course_name': sub,
-            'dept_code': dept,
-            'required_room_type': 'Lecture'
-        })
-        course_id += 1
-courses_df = pd.DataFrame(courses)
-courses_df.to_csv('courses.csv', index=False)
-
-# Rooms (shared by all departments)
-rooms = []
-for i in range(1, 11):
-    rooms.append({
-        'room_id': i,
-        'room_name': f'Room_{i}',
-        'dept_code': random.choice(departments),
-        'room_type': random.choice(['Lecture', 'Lab']),
-        'capacity': random.choice([30, 40, 50])
-    })
-rooms_df = pd.DataFrame(rooms)
-rooms_df.to_csv('rooms.csv', index=False)
-
-# Timeslots (common)
-timeslots = []
-days = ['Mon','Tue','Wed','Thu','Fri']
-for day_idx, day in enumerate(days):
-    for period in range(6):
-        timeslots.append({
-            'timeslot_id': day_idx * 6 + period,
-            'day': day,
-            'start_time': f'{9+period}:00'
-        })
-timeslots_df = pd.DataFrame(timeslots)
-timeslots_df.to_csv('timeslots.csv', index=False)
-
-# Professors per department
-professors = []
-prof_id = 1
-for dept in departments:
-    for i in range(2):  # 2 professors per dept
-        professors.append({
-            'professor_id': prof_id,
-            'name': f'Prof_{dept}_{i+1}',
-            'dept_code': dept,
-            'max_load_per_week': random.randint(4, 6)
-        })
-        prof_id += 1
-professors_df = pd.DataFrame(professors)
-professors_df.to_csv('professors.csv', index=False)
-
-# Professor availability
-prof_availability = []
-for prof in professors:
-    for ts in timeslots:
-        available = 1 if random.random() < 0.7 else 0
-        prof_availability.append({
-            'professor_id': prof['professor_id'],
-            'timeslot_id': ts['timeslot_id'],
-            'available': available
-        })
-prof_avail_df = pd.DataFrame(prof_availability)
-prof_avail_df.to_csv('prof_availability.csv', index=False)
-
-# Students enrolled with departments and course enrollments
-num_students = 60
-students = []
-enrollments = []
-for sid in range(1, num_students + 1):
-    dept = random.choice(departments)
-    students.append({'student_id': sid, 'dept_code': dept})
-
-    dept_courses = [c['course_id'] for c in courses if c['dept_code'] == dept]
-    enrolled_courses = random.sample(dept_courses,
-                                     min(len(dept_courses), random.randint(2, 3)))
-    for cid in enrolled_courses:
-        enrollments.append({'student_id': sid, 'course_id': cid})
-
-students_df = pd.DataFrame(students)
-students_df.to_csv('students.csv', index=False)
-enrollments_df = pd.DataFrame(enrollments)
-enrollments_df.to_csv('enrollments.csv', index=False)
-
-# Preferred timeslots for courses
-course_pref = []
-num_timeslots = len(timeslots)
-for c in courses:
-    prefs = random.sample(range(num_timeslots), random.randint(1, 3))
-    for ts in prefs:
-        course_pref.append({'course_id': c['course_id'], 'timeslot_id': ts})
-course_pref_df = pd.DataFrame(course_pref)
-course_pref_df.to_csv('course_preferred_timeslots.csv', index=False)
-
-print("Dynamic dataset generated in data/ folder.")
+import argparse
+import io
+import os
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from dataset_loader import TABLES
+
+DEPARTMENT_CODES = ['CSE', 'ECE', 'ME', 'CE', 'EEE', 'CHE', 'BT', 'MME', 'AE', 'PHY', 'CHY', 'MA']
+DAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat']
+ROOM_CAPACITIES = [30, 40, 50]
+OUTPUT_FORMATS = ('csv', 'zip', 'parquet')
+# Course popularity inside a department: every course equally likely, or Zipf-distributed ranks
+POPULARITY_DISTRIBUTIONS = ('uniform', 'zipf')
+
+# Keyword arguments for generate_dataset; 'small' matches the original toy dataset
+PRESETS = {
+    'small': dict(departments=4, courses_per_dept=3, rooms=10, professors_per_dept=2, students=60),
+    'large': dict(departments=50, courses_per_dept=40, rooms=250, professors_per_dept=10, students=50_000,
+                  courses_per_student=(4, 6), popularity='zipf', lab_course_share=0.2, lab_share=0.3),
+}
+
+
+def department_codes(n):
+    """``n`` department codes, the named ones first and then ``D13``, ``D14``, ..."""
+    return DEPARTMENT_CODES[:n] + [f'D{i + 1}' for i in range(len(DEPARTMENT_CODES), n)]
+
+
+def _random_subsets(rng, n_rows, n_items, sizes, log_weights=None):
+    """Pick ``sizes[i]`` distinct items out of ``n_items`` for every row, all rows at once.
+
+    Uses the Gumbel top-k trick: ranking ``log_weights`` plus Gumbel noise
+    samples without replacement in proportion to the weights. Returns the
+    ``(row, item)`` index arrays of the picks.
+    """
+    keys = rng.gumbel(size=(n_rows, n_items))
+    if log_weights is not None:
+        keys += log_weights
+    width = int(sizes.max(initial=0))
+    picks = np.argsort(-keys, axis=1)[:, :width]
+    keep = np.arange(width)[None, :] < sizes[:, None]
+    rows = np.broadcast_to(np.arange(n_rows)[:, None], picks.shape)
+    return rows[keep], picks[keep]
+
+
+def generate_dataset(
+    departments=4,
+    courses_per_dept=3,
+    rooms=10,
+    professors_per_dept=2,
+    students=60,
+    days=5,
+    periods_per_day=6,
+    availability=0.7,
+    max_load=(4, 6),
+    courses_per_student=(2, 3),
+    popularity='uniform',
+    popularity_skew=1.0,
+    preferred_timeslots=(1, 3),
+    lab_share=0.5,
+    lab_course_share=0.0,
+    seed=0,
+):
+    """Build a synthetic institution as the eight input DataFrames, in :data:`TABLES` order.
+
+    Every table is drawn with vectorized NumPy from one seeded generator,
+    so the same arguments always give the same dataset. ``availability`` is
+    the chance a professor is available in a timeslot. Each student
+    belongs to a department and takes between ``courses_per_student``
+    courses from it, chosen with ``popularity`` weights (Zipf ranks use
+    exponent ``popularity_skew``). ``lab_share`` and ``lab_course_share``
+    are the shares of rooms that are labs and of courses that need one.
+    Ranges are inclusive ``(low, high)`` pairs.
+    """
+    if popularity not in POPULARITY_DISTRIBUTIONS:
+        raise ValueError(f"Unknown popularity distribution: {popularity!r} "
+                         f"(expected one of {POPULARITY_DISTRIBUTIONS})")
+    if not 1 <= days <= len(DAYS):
+        raise ValueError(f"days must be between 1 and {len(DAYS)}")
+    rng = np.random.default_rng(seed)
+    depts = np.array(department_codes(departments), dtype=object)
+
+    n_courses = departments * courses_per_dept
+    course_dept = np.repeat(np.arange(departments), courses_per_dept)
+    course_number = np.tile(np.arange(1, courses_per_dept + 1), departments)
+    courses_df = pd.DataFrame({
+        'course_id': np.arange(1, n_courses + 1),
+        'course_name': [f'{dept} {number:03d}' for dept, number in zip(depts[course_dept], course_number)],
+        'dept_code': depts[course_dept],
+        'required_room_type': np.where(rng.random(n_courses) < lab_course_share, 'Lab', 'Lecture'),
+    })
+
+    rooms_df = pd.DataFrame({
+        'room_id': np.arange(1, rooms + 1),
+        'room_name': [f'Room_{i}' for i in range(1, rooms + 1)],
+        'dept_code': depts[rng.integers(departments, size=rooms)],
+        'room_type': np.where(rng.random(rooms) < lab_share, 'Lab', 'Lecture'),
+        'capacity': rng.choice(ROOM_CAPACITIES, size=rooms),
+    })
+
+    n_timeslots = days * periods_per_day
+    period = np.tile(np.arange(periods_per_day), days)
+    timeslots_df = pd.DataFrame({
+        'timeslot_id': np.arange(n_timeslots),
+        'day': np.repeat(DAYS[:days], periods_per_day),
+        'start_time': [f'{9 + p}:00' for p in period],
+    })
+
+    n_professors = departments * professors_per_dept
+    prof_dept = np.repeat(np.arange(departments), professors_per_dept)
+    prof_number = np.tile(np.arange(1, professors_per_dept + 1), departments)
+    professors_df = pd.DataFrame({
+        'professor_id': np.arange(1, n_professors + 1),
+        'name': [f'Prof_{dept}_{number}' for dept, number in zip(depts[prof_dept], prof_number)],
+        'dept_code': depts[prof_dept],
+        'max_load_per_week': rng.integers(max_load[0], max_load[1] + 1, size=n_professors),
+    })
+
+    prof_avail_df = pd.DataFrame({
+        'professor_id': np.repeat(professors_df['professor_id'].to_numpy(), n_timeslots),
+        'timeslot_id': np.tile(timeslots_df['timeslot_id'].to_numpy(), n_professors),
+        'available': (rng.random(n_professors * n_timeslots) < availability).astype(np.int8),
+    })
+
+    student_dept = rng.integers(departments, size=students)
+    students_df = pd.DataFrame({'student_id': np.arange(1, students + 1), 'dept_code': depts[student_dept]})
+
+    # Popularity ranks are shuffled per department so the favourite course is not always the first
+    if popularity == 'zipf':
+        ranks = rng.permuted(np.tile(np.arange(1, courses_per_dept + 1), (departments, 1)), axis=1)
+        log_weights = -popularity_skew * np.log(ranks)[student_dept]
+    else:
+        log_weights = None
+    low, high = (min(bound, courses_per_dept) for bound in courses_per_student)
+    taken = rng.integers(low, high + 1, size=students)
+    student, course = _random_subsets(rng, students, courses_per_dept, taken, log_weights)
+    enrollments_df = pd.DataFrame({
+        'student_id': student + 1,
+        'course_id': student_dept[student] * courses_per_dept + course + 1,
+    })
+
+    low, high = (min(bound, n_timeslots) for bound in preferred_timeslots)
+    course, slot = _random_subsets(rng, n_courses, n_timeslots, rng.integers(low, high + 1, size=n_courses))
+    course_pref_df = pd.DataFrame({'course_id': course + 1, 'timeslot_id': slot})
+
+    return (courses_df, rooms_df, timeslots_df, professors_df, prof_avail_df,
+            students_df, enrollments_df, course_pref_df)
+
+
+def write_dataset(frames, path, fmt='csv'):
+    """Write the tables as CSV or Parquet files in directory ``path``, or as CSVs inside ZIP ``path``.
+
+    A ZIP can be sent to ``/upload`` as is; a directory can be read by
+    ``timetable_generator.py`` run from inside it.
+    """
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {fmt!r} (expected one of {OUTPUT_FORMATS})")
+    if fmt == 'zip':
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for table, df in zip(TABLES, frames):
+                buffer = io.StringIO()
+                df.to_csv(buffer, index=False)
+                archive.writestr(f'{table}.csv', buffer.getvalue())
+        return
+    os.makedirs(path, exist_ok=True)
+    for table, df in zip(TABLES, frames):
+        if fmt == 'parquet':
+            df.to_parquet(os.path.join(path, f'{table}.parquet'), index=False)
+        else:
+            df.to_csv(os.path.join(path, f'{table}.csv'), index=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic timetabling dataset.")
+    parser.add_argument("--preset", choices=PRESETS, default='small',
+                        help="starting sizes; the options below override them")
+    parser.add_argument("--departments", type=int, help="number of departments")
+    parser.add_argument("--courses-per-dept", type=int, help="courses in each department")
+    parser.add_argument("--rooms", type=int, help="rooms shared by all departments")
+    parser.add_argument("--professors-per-dept", type=int, help="professors in each department")
+    parser.add_argument("--students", type=int, help="number of students")
+    parser.add_argument("--days", type=int, help="teaching days per week")
+    parser.add_argument("--periods-per-day", type=int, help="timeslots per day, hourly from 9:00")
+    parser.add_argument("--availability", type=float,
+                        help="chance that a professor is available in a timeslot")
+    parser.add_argument("--courses-per-student", type=int, nargs=2, metavar=("MIN", "MAX"),
+                        help="range of courses each student takes in their department")
+    parser.add_argument("--popularity", choices=POPULARITY_DISTRIBUTIONS,
+                        help="how students choose between a department's courses")
+    parser.add_argument("--popularity-skew", type=float, help="Zipf exponent for --popularity zipf")
+    parser.add_argument("--lab-share", type=float, help="share of rooms that are labs")
+    parser.add_argument("--lab-course-share", type=float, help="share of courses that need a lab")
+    parser.add_argument("--seed", type=int, default=0, help="seed; the same seed gives the same dataset")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default='csv',
+                        help="CSV or Parquet files in a directory, or a ZIP of CSVs ready for /upload")
+    parser.add_argument("--output", default=None,
+                        help="output directory, or file for --format zip (default: current directory / dataset.zip)")
+    args = parser.parse_args()
+
+    options = dict(PRESETS[args.preset])
+    for name in ('departments', 'courses_per_dept', 'rooms', 'professors_per_dept', 'students', 'days',
+                 'periods_per_day', 'availability', 'courses_per_student', 'popularity', 'popularity_skew',
+                 'lab_share', 'lab_course_share'):
+        if getattr(args, name) is not None:
+            options[name] = getattr(args, name)
+    frames = generate_dataset(seed=args.seed, **options)
+    output = args.output or ('dataset.zip' if args.format == 'zip' else '.')
+    write_dataset(frames, output, args.format)
+    counts = ", ".join(f"{len(df)} {table}" for table, df in zip(TABLES, frames))
+    print(f"Dataset written to {output}: {counts}")
@@ -0,0 +1,108 @@
+import io
+import os
+import time
+import tracemalloc
+import zipfile
+
+import pandas as pd
+from fastapi import HTTPException
+
+# The eight input tables, in the order compile_department and run_ga_scheduling take them
+TABLES = ('courses', 'rooms', 'timeslots', 'professors', 'prof_availability',
+          'students', 'enrollments', 'course_preferred_timeslots')
+
+# Declared column types: ids are integers, repeated labels are categoricals.
+# Columns not listed here are read with inferred types.
+SCHEMAS = {
+    'courses': {'course_id': 'int64', 'course_name': str, 'dept_code': 'category',
+                'required_room_type': 'category'},
+    'rooms': {'room_id': 'int64', 'room_name': str, 'dept_code': 'category', 'room_type': 'category',
+              'capacity': 'int64'},
+    'timeslots': {'timeslot_id': 'int64', 'day': 'category', 'start_time': str},
+    'professors': {'professor_id': 'int64', 'name': str, 'dept_code': 'category', 'max_load_per_week': 'int64'},
+    'prof_availability': {'professor_id': 'int64', 'timeslot_id': 'int64', 'available': 'int8'},
+    'students': {'student_id': 'int64', 'dept_code': 'category'},
+    'enrollments': {'student_id': 'int64', 'course_id': 'int64'},
+    'course_preferred_timeslots': {'course_id': 'int64', 'timeslot_id': 'int64'},
+}
+# Declared columns an upload may leave out; nothing reads them
+OPTIONAL_COLUMNS = {
+    'rooms': ('dept_code',),
+}
+
+CSV_ENGINES = ('c', 'pyarrow')
+# 'pyarrow' parses multithreaded and is much faster on large exports
+CSV_ENGINE = 'c'
+
+
+def _parse(table, name, stream, engine):
+    schema = SCHEMAS[table]
+    try:
+        if name.endswith('.parquet'):
+            df = pd.read_parquet(io.BytesIO(stream.read()))
+            return df.astype({col: dtype for col, dtype in schema.items() if col in df.columns})
+        return pd.read_csv(stream, dtype=schema, engine=engine)
+    except (ValueError, TypeError, KeyError, OSError) as exc:
+        raise HTTPException(status_code=400, detail=f"Could not parse {name}: {exc}")
+
+
+def _read_tables(names, open_member, engine):
+    """Parse every table with ``open_member(name)``, timing each and tracking its peak memory.
+
+    Peak memory is measured with tracemalloc, so it covers Python and NumPy
+    allocations but not memory pyarrow allocates on its own.
+    """
+    if engine not in CSV_ENGINES:
+        raise ValueError(f"Unknown CSV engine: {engine!r} (expected one of {CSV_ENGINES})")
+    started = time.perf_counter()
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    frames, files = [], []
+    try:
+        for table in TABLES:
+            name = names.get(f"{table}.parquet") or names.get(f"{table}.csv")
+            if name is None:
+                raise HTTPException(status_code=400, detail=f"Missing required file: {table}.csv")
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            file_started = time.perf_counter()
+            with open_member(name) as stream:
+                df = _parse(table, name, stream, engine)
+            files.append({
+                "name": name,
+                "format": "parquet" if name.endswith('.parquet') else "csv",
+                "rows": len(df),
+                "seconds": round(time.perf_counter() - file_started, 4),
+                "peak_bytes": tracemalloc.get_traced_memory()[1] - baseline,
+            })
+            frames.append(df)
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    report = {
+        "engine": engine,
+        "files": files,
+        "seconds": round(time.perf_counter() - started, 4),
+        "peak_bytes": max((f["peak_bytes"] for f in files), default=0),
+    }
+    return tuple(frames), report
+
+
+def load_zip(fileobj, engine=CSV_ENGINE):
+    """Parse the input tables straight out of a ZIP archive without extracting it.
+
+    Each table may be ``<table>.csv`` or ``<table>.parquet`` at the top of
+    the archive. Returns ``(frames, report)`` with the frames in
+    :data:`TABLES` order and per-file timings and peak memory in ``report``.
+    Raises ``zipfile.BadZipFile`` for a broken archive.
+    """
+    with zipfile.ZipFile(fileobj) as archive:
+        names = {name: name for name in archive.namelist()}
+        return _read_tables(names, archive.open, engine)
+
+
+def load_directory(path, engine=CSV_ENGINE):
+    """Like :func:`load_zip`, for tables stored as files in a directory."""
+    names = {name: name for name in os.listdir(path)}
+    return _read_tables(names, lambda name: open(os.path.join(path, name), 'rb'), engine)
@@ -0,0 +1,188 @@
+import time
+
+import pandas as pd
+
+from dataset_loader import OPTIONAL_COLUMNS, SCHEMAS, TABLES
+from problem_model import MIN_ROOM_CAPACITY
+
+# Offending rows included with each issue
+MAX_EXAMPLES = 5
+
+# Columns that must be unique within their table
+PRIMARY_KEYS = {
+    'courses': ['course_id'],
+    'rooms': ['room_id'],
+    'timeslots': ['timeslot_id'],
+    'professors': ['professor_id'],
+    'students': ['student_id'],
+}
+
+# (table, column, referenced table, referenced column)
+FOREIGN_KEYS = [
+    ('prof_availability', 'professor_id', 'professors', 'professor_id'),
+    ('prof_availability', 'timeslot_id', 'timeslots', 'timeslot_id'),
+    ('enrollments', 'student_id', 'students', 'student_id'),
+    ('enrollments', 'course_id', 'courses', 'course_id'),
+    ('course_preferred_timeslots', 'course_id', 'courses', 'course_id'),
+    ('course_preferred_timeslots', 'timeslot_id', 'timeslots', 'timeslot_id'),
+]
+
+
+class ValidationReport:
+    """Errors make a dataset unusable; warnings only mean some constraints cannot all be met."""
+
+    def __init__(self):
+        self.errors = []
+        self.warnings = []
+
+    def add(self, level, code, table, message, rows=None):
+        issue = {"code": code, "table": table, "message": message}
+        if rows is not None:
+            issue["count"] = len(rows)
+            issue["examples"] = rows.head(MAX_EXAMPLES).to_dict('records')
+        (self.errors if level == 'error' else self.warnings).append(issue)
+
+    def summary(self):
+        """One line naming the first few errors, for the upload response."""
+        messages = [issue["message"] for issue in self.errors[:3]]
+        more = len(self.errors) - len(messages)
+        return "; ".join(messages) + (f" (and {more} more)" if more > 0 else "")
+
+
+def _check_columns(tables, report):
+    for table in TABLES:
+        missing = [col for col in SCHEMAS[table]
+                   if col not in tables[table].columns and col not in OPTIONAL_COLUMNS.get(table, ())]
+        if missing:
+            report.add('error', 'missing_columns', table, f"{table} is missing columns: {', '.join(missing)}")
+
+
+def _check_keys(tables, report):
+    for table, columns in PRIMARY_KEYS.items():
+        dupes = tables[table][tables[table].duplicated(columns, keep=False)]
+        if len(dupes):
+            report.add('error', 'duplicate_id', table, f"{table} has duplicate {', '.join(columns)} values",
+                       dupes[columns].drop_duplicates())
+    avail = tables['prof_availability']
+    clashing = avail.drop_duplicates().duplicated(['professor_id', 'timeslot_id'], keep=False)
+    if clashing.any():
+        rows = avail.drop_duplicates()[clashing]
+        report.add('warning', 'conflicting_availability', 'prof_availability',
+                   "prof_availability lists some professor/timeslot pairs as both available and unavailable", rows)
+
+    for table, column, ref_table, ref_column in FOREIGN_KEYS:
+        values = tables[table][column]
+        dangling = tables[table][~values.isin(tables[ref_table][ref_column])]
+        if len(dangling):
+            report.add('error', 'unknown_reference', table,
+                       f"{table}.{column} refers to {ref_table} that do not exist", dangling)
+
+
+def _check_departments(tables, report):
+    courses, professors = tables['courses'], tables['professors']
+    avail = tables['prof_availability']
+    n_timeslots = len(tables['timeslots'])
+
+    course_depts = courses.groupby('dept_code', observed=True).size().rename('courses')
+    staff = professors.groupby('dept_code', observed=True).agg(
+        professors=('professor_id', 'size'), max_load=('max_load_per_week', 'sum'))
+    available = avail[avail['available'] == 1].drop_duplicates(['professor_id', 'timeslot_id'])
+    slots = available.groupby('professor_id').size().rename('available_slots')
+    prof_slots = professors.join(slots, on='professor_id').fillna({'available_slots': 0})
+    prof_slots['usable'] = prof_slots[['available_slots', 'max_load_per_week']].min(axis=1)
+    usable = prof_slots.groupby('dept_code', observed=True)['usable'].sum().rename('usable')
+    depts = pd.concat([course_depts, staff, usable], axis=1).fillna(0).astype('int64').reset_index(names='dept_code')
+    depts = depts[depts['courses'] > 0]
+
+    no_staff = depts[depts['professors'] == 0]
+    if len(no_staff):
+        report.add('error', 'no_professors', 'professors', "Some departments have courses but no professors",
+                   no_staff[['dept_code', 'courses']])
+    no_slots = depts[(depts['professors'] > 0) & (depts['usable'] == 0)]
+    if len(no_slots):
+        report.add('error', 'no_availability', 'prof_availability',
+                   "Some departments have no professor available in any timeslot", no_slots[['dept_code', 'courses']])
+
+    idle = prof_slots[prof_slots['available_slots'] == 0]
+    if len(idle):
+        report.add('warning', 'professor_without_availability', 'prof_availability',
+                   "Some professors are not available in any timeslot", idle[['professor_id', 'dept_code']])
+    pairs = avail.drop_duplicates(['professor_id', 'timeslot_id']).groupby('professor_id').size()
+    partial = professors[professors['professor_id'].map(pairs).fillna(0) < n_timeslots]
+    if len(partial):
+        report.add('warning', 'incomplete_availability', 'prof_availability',
+                   "Some professors have no availability row for some timeslots; those count as unavailable",
+                   partial[['professor_id', 'dept_code']])
+
+    overloaded = depts[(depts['professors'] > 0) & (depts['courses'] > depts['usable'])]
+    if len(overloaded):
+        report.add('warning', 'professor_capacity', 'professors',
+                   "Some departments have more courses than their professors' available, load-limited slots",
+                   overloaded[['dept_code', 'courses', 'max_load', 'usable']])
+
+
+def _check_rooms(tables, report):
+    courses, rooms = tables['courses'], tables['rooms']
+    n_timeslots = len(tables['timeslots'])
+    usable = rooms[rooms['capacity'] >= MIN_ROOM_CAPACITY]
+    supply = usable.groupby(usable['room_type'].astype(str)).size().rename('rooms')
+    demand = courses.groupby(courses['required_room_type'].astype(str)).size().rename('courses')
+    types = pd.concat([demand, supply], axis=1).fillna(0).astype('int64').reset_index(names='room_type')
+    types = types[types['courses'] > 0]
+
+    missing = types[types['rooms'] == 0]
+    if len(missing):
+        report.add('error', 'no_room_of_type', 'rooms',
+                   f"No room with capacity >= {MIN_ROOM_CAPACITY} provides some required room types",
+                   missing[['room_type', 'courses']])
+    short = types[(types['rooms'] > 0) & (types['courses'] > types['rooms'] * n_timeslots)]
+    if len(short):
+        report.add('warning', 'room_capacity', 'rooms',
+                   "Some room types are needed by more courses than their rooms have timeslots",
+                   short[['room_type', 'courses', 'rooms']])
+
+
+def _check_timeslots(tables, report):
+    timeslots = tables['timeslots']
+    if not len(timeslots):
+        report.add('error', 'no_timeslots', 'timeslots', "timeslots is empty")
+        return
+    dupes = timeslots[timeslots.duplicated(['day', 'start_time'], keep=False)]
+    if len(dupes):
+        report.add('warning', 'duplicate_timeslot', 'timeslots', "Some timeslots share a day and start time",
+                   dupes[['timeslot_id', 'day', 'start_time']])
+    avail = tables['prof_availability']
+    covered = avail.loc[avail['available'] == 1, 'timeslot_id']
+    uncovered = timeslots[~timeslots['timeslot_id'].isin(covered)]
+    if len(uncovered):
+        report.add('warning', 'timeslot_without_professors', 'timeslots',
+                   "No professor is available in some timeslots", uncovered[['timeslot_id', 'day', 'start_time']])
+
+
+def validate_dataset(frames):
+    """Check the eight input tables before any GA work is done.
+
+    Runs vectorized checks for required columns, duplicate ids, references
+    to unknown rows, timeslot coverage and feasibility bounds (course demand
+    against professor loads and availability, and against room supply per
+    room type). Returns a dict with ``valid``, ``errors``, ``warnings``,
+    ``seconds`` and, if invalid, a one-line ``summary``.
+    """
+    started = time.perf_counter()
+    tables = dict(zip(TABLES, frames))
+    report = ValidationReport()
+    _check_columns(tables, report)
+    if not report.errors:
+        _check_keys(tables, report)
+        _check_timeslots(tables, report)
+        _check_departments(tables, report)
+        _check_rooms(tables, report)
+    result = {
+        "valid": not report.errors,
+        "errors": report.errors,
+        "warnings": report.warnings,
+        "seconds": round(time.perf_counter() - started, 4),
+    }
+    if report.errors:
+        result["summary"] = report.summary()
+    return result
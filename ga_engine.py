@@ -0,0 +1,496 @@
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+from constructive_seeding import SEEDED_FRACTION, dsatur_individual
+from local_search import LOCAL_SEARCH_TIME, repair_elites
+from problem_model import NO_PROFESSOR
+from telemetry import PhaseTimer
+from vectorized_fitness import batch_fitness, population_to_array
+
+POPULATION_SIZE = 100
+GENERATIONS = 50
+MUTATION_RATE = 0.15
+VECTORIZED_FITNESS = True
+FITNESS_CACHE_SIZE = 4096
+# Share of genes drawn from the full timeslot x professor space instead of the feasible domain
+UNCONSTRAINED_SHARE = 0.1
+
+
+def print_progress(event):
+    """Default progress sink: writes GA progress events to stdout."""
+    dept, kind = event['dept'], event['type']
+    if kind == 'generation' and 'island_scores' in event:
+        print(f"[{dept}] Gen {event['generation']}, Island best scores: {event['island_scores']}")
+    elif kind == 'generation':
+        print(f"[{dept}] Gen {event['generation']}, Best Score: {event['best_score']}")
+    elif kind == 'timings':
+        phases = ", ".join(f"{key} {value:.3f}s" for key, value in event.items() if key not in ('type', 'dept'))
+        print(f"[{dept}] Time: {phases}")
+    elif kind == 'profile':
+        hottest = ", ".join(f"{f['function']} {f['self_share']:.0%}" for f in event['functions'][:5])
+        print(f"[{dept}] Profile: {event['samples']} samples over {event['seconds']}s, hottest: {hottest}")
+    elif kind == 'evaluations':
+        details = ", ".join(f"{key}: {value}" for key, value in event.items() if key not in ('type', 'dept'))
+        print(f"[{dept}] Fitness {details}")
+    elif kind == 'result' and 'stop_reason' in event:
+        print(f"[{dept}] Best score: {event['best_score']}, hard violations: {event['hard_violations']} "
+              f"(stopped: {event['stop_reason']} after {event['generations']} generations)")
+    elif kind == 'result':
+        print(f"[{dept}] Best score: {event['best_score']}")
+    elif kind == 'local_search':
+        print(f"[{dept}] Gen {event['generation']}, local search repaired {event['repaired']} elites "
+              f"in {event['moves']} moves, hard violations {event['hard_violations_before']} -> "
+              f"{event['hard_violations_after']}")
+    elif kind == 'repair':
+        print(f"[{dept}] After reservation repair: best score {event['best_score']}, hard violations "
+              f"{event['hard_violations_before']} -> {event['hard_violations']} in {event['moves']} moves")
+    elif kind == 'seeding':
+        print(f"[{dept}] Seeded {event['seeded']} timetables in {event['seconds']:.3f}s, "
+              f"best starting score {event['seeded_best_score']} (random: {event['random_best_score']})")
+    elif kind == 'room_conflicts':
+        print(f"[{dept}] {len(event['conflicts'])} cross-department room conflicts ({event['mode']} room sharing)")
+        for conflict in event['conflicts'][:10]:
+            courses = ", ".join(f"{b['course_id']} ({b['dept']})" for b in conflict['bookings'])
+            print(f"  room {conflict['room_id']}, timeslot {conflict['timeslot_id']}: {courses}")
+        if len(event['conflicts']) > 10:
+            print(f"  ... and {len(event['conflicts']) - 10} more")
+    elif kind == 'dataset':
+        print(f"[{dept}] Inputs stored as dataset {event['dataset_id']}")
+    elif kind == 'cache':
+        print(f"[{dept}] Result cache {event['status']}")
+    elif kind == 'warning':
+        print(f"[{dept}] Warning: {event['message']}")
+    else:
+        print(f"[{dept}] {event}")
+
+
+def random_gene(model, c, rng=random, unconstrained_share=UNCONSTRAINED_SHARE):
+    """Draw a gene for course ``c``.
+
+    Rooms always come from the course's room-type/capacity domain. The
+    (professor, timeslot) pair comes from the professors' availability
+    domain, except for ``unconstrained_share`` of draws (or when the domain
+    is empty), which pick both uniformly to keep diversity.
+    """
+    room = rng.choice(model.candidate_rooms[c])
+    prof_slots = model.feasible_prof_slots[c]
+    if prof_slots and rng.random() >= unconstrained_share:
+        prof, timeslot = rng.choice(prof_slots)
+        return (timeslot, room, prof)
+    timeslot = rng.randrange(model.n_timeslots)
+    prof = rng.choice(model.candidate_profs) if model.candidate_profs else NO_PROFESSOR
+    return (timeslot, room, prof)
+
+
+def create_individual(model, rng=random, unconstrained_share=UNCONSTRAINED_SHARE):
+    return [random_gene(model, c, rng, unconstrained_share) for c in range(model.n_courses)]
+
+
+def initial_population(model, population_size, rng=random, unconstrained_share=UNCONSTRAINED_SHARE,
+                       seeded_fraction=SEEDED_FRACTION):
+    """Return ``(population, seeded, seconds)``.
+
+    The first ``seeded`` individuals are built by DSatur seeding (see
+    :mod:`constructive_seeding`), which took ``seconds``; the rest are random.
+    """
+    started = time.monotonic()
+    seeded = min(population_size, int(round(population_size * seeded_fraction)))
+    population = [dsatur_individual(model, rng) for _ in range(seeded)]
+    seconds = time.monotonic() - started
+    population += [create_individual(model, rng, unconstrained_share) for _ in range(population_size - seeded)]
+    return population, seeded, seconds
+
+
+def seeding_event(dept_code, scores, seeded, seconds):
+    """Progress event comparing the starting scores of seeded and random individuals."""
+    return {"type": "seeding", "dept": dept_code, "seeded": seeded, "seconds": round(seconds, 4),
+            "seeded_best_score": max(scores[:seeded]) if seeded else None,
+            "random_best_score": max(scores[seeded:]) if seeded < len(scores) else None}
+
+
+def fitness(model, individual):
+    room_ok_bits = model.room_ok_bits
+    prof_avail_bits = model.prof_avail_bits
+    preferred_bits = model.preferred_bits
+    course_student_bits = model.course_student_bits
+    conflict_neighbors = model.conflict_neighbors
+    n_timeslots = model.n_timeslots
+
+    score = 0
+    # Slots booked by other departments count as already used
+    used_room_time = set(model.reserved_room_slots)
+    prof_time = [0] * model.n_professors
+    prof_load = [0] * model.n_professors
+    # Students already busy in each timeslot, as bitsets
+    slot_students = [0] * n_timeslots
+
+    for c, (ts, room, prof) in enumerate(individual):
+        bit = 1 << ts
+
+        if room_ok_bits[c] >> room & 1:
+            score += 1
+        else:
+            score -= 5
+
+        key = room * n_timeslots + ts
+        if key in used_room_time:
+            score -= 10
+        else:
+            used_room_time.add(key)
+            score += 2
+
+        if prof != NO_PROFESSOR:
+            if not prof_avail_bits[prof] & bit:
+                score -= 10
+            if prof_time[prof] & bit:
+                score -= 15
+            prof_time[prof] |= bit
+            prof_load[prof] += 1
+            score += 2
+        else:
+            score -= 5
+
+        # Only students shared with a neighbour in the conflict graph can clash
+        if conflict_neighbors[c]:
+            students = course_student_bits[c]
+            busy = slot_students[ts]
+            score -= 15 * (busy & students).bit_count()
+            slot_students[ts] = busy | students
+
+        if preferred_bits[c] & bit:
+            score += 3
+
+    for load, max_load in zip(prof_load, model.max_load):
+        if load > max_load:
+            score -= (load - max_load) * 10
+    return score
+
+
+def hard_violations(model, individual):
+    """Count hard-constraint violations in a timetable.
+
+    Counts wrong room type/capacity, room double-bookings, professor
+    unavailability and clashes, student clashes and each class over a
+    professor's weekly load. A timetable with zero violations is feasible.
+    """
+    room_ok_bits = model.room_ok_bits
+    prof_avail_bits = model.prof_avail_bits
+    course_student_bits = model.course_student_bits
+    conflict_neighbors = model.conflict_neighbors
+    n_timeslots = model.n_timeslots
+
+    violations = 0
+    used_room_time = set(model.reserved_room_slots)
+    prof_time = [0] * model.n_professors
+    prof_load = [0] * model.n_professors
+    # Students already busy in each timeslot, as bitsets
+    slot_students = [0] * n_timeslots
+
+    for c, (ts, room, prof) in enumerate(individual):
+        bit = 1 << ts
+        if not room_ok_bits[c] >> room & 1:
+            violations += 1
+        key = room * n_timeslots + ts
+        if key in used_room_time:
+            violations += 1
+        else:
+            used_room_time.add(key)
+        if prof != NO_PROFESSOR:
+            if not prof_avail_bits[prof] & bit:
+                violations += 1
+            if prof_time[prof] & bit:
+                violations += 1
+            prof_time[prof] |= bit
+            prof_load[prof] += 1
+        if conflict_neighbors[c]:
+            students = course_student_bits[c]
+            busy = slot_students[ts]
+            violations += (busy & students).bit_count()
+            slot_students[ts] = busy | students
+
+    for load, max_load in zip(prof_load, model.max_load):
+        if load > max_load:
+            violations += load - max_load
+    return violations
+
+
+@dataclass
+class StoppingCriteria:
+    """Early-stopping rules checked after every generation.
+
+    ``time_budget`` is wall-clock seconds for the whole run,
+    ``stall_generations`` stops after that many generations without a new
+    best, ``target_score`` stops once the best score reaches it and
+    ``stop_when_feasible`` once the best timetable has no hard violations.
+    The ``generations`` argument of the GA remains the hard cap.
+    """
+    time_budget: Optional[float] = None
+    stall_generations: Optional[int] = None
+    target_score: Optional[int] = None
+    stop_when_feasible: bool = False
+
+    def check(self, elapsed, stalled, best_score, best_violations=None):
+        if self.target_score is not None and best_score >= self.target_score:
+            return 'target_score'
+        if self.stop_when_feasible and best_violations == 0:
+            return 'feasible'
+        if self.stall_generations is not None and stalled >= self.stall_generations:
+            return 'stalled'
+        if self.time_budget is not None and elapsed >= self.time_budget:
+            return 'time_budget'
+        return None
+
+
+@dataclass
+class GAResult:
+    best: list
+    best_score: float
+    hard_violations: int
+    generations: int
+    stop_reason: str
+    elapsed: float
+    # Seconds per GA phase (see telemetry.PHASES)
+    timings: dict = field(default_factory=dict)
+
+    def event(self, dept_code):
+        return {"type": "result", "dept": dept_code, "best_score": self.best_score,
+                "hard_violations": self.hard_violations, "generations": self.generations,
+                "stop_reason": self.stop_reason, "elapsed": round(self.elapsed, 3)}
+
+
+def evaluate_population(model, population, vectorized=VECTORIZED_FITNESS):
+    """Score a list of timetables, batched through NumPy unless ``vectorized`` is off."""
+    if vectorized and population:
+        return batch_fitness(model, population_to_array(population)).tolist()
+    return [fitness(model, ind) for ind in population]
+
+
+class FitnessCache:
+    """Genome-keyed score cache with LRU eviction.
+
+    Every timetable is scored at most once while it stays in the cache;
+    ``evaluations`` counts real fitness computations and ``hits`` the ones
+    that were served from the cache instead. ``penalty``, if given, maps a
+    list of timetables to amounts subtracted from their fitness.
+    """
+
+    def __init__(self, model, max_size=FITNESS_CACHE_SIZE, vectorized=VECTORIZED_FITNESS, penalty=None):
+        self.model = model
+        self.max_size = max_size
+        self.vectorized = vectorized
+        self.penalty = penalty
+        self.evaluations = 0
+        self.hits = 0
+        self._scores = OrderedDict()
+
+    def scores(self, population):
+        keys = [tuple(ind) for ind in population]
+        missing = {}
+        for key, ind in zip(keys, population):
+            if key in self._scores:
+                self._scores.move_to_end(key)
+                self.hits += 1
+            elif key in missing:
+                self.hits += 1
+            else:
+                missing[key] = ind
+
+        individuals = list(missing.values())
+        fresh_scores = evaluate_population(self.model, individuals, self.vectorized)
+        if self.penalty is not None and individuals:
+            fresh_scores = [score - cost for score, cost in zip(fresh_scores, self.penalty(individuals))]
+        fresh = dict(zip(missing, fresh_scores))
+        self.evaluations += len(fresh)
+        result = [self._scores[key] if key in self._scores else fresh[key] for key in keys]
+
+        self._scores.update(fresh)
+        while len(self._scores) > self.max_size:
+            self._scores.popitem(last=False)
+        return result
+
+    def store(self, individual, score):
+        """Record a raw fitness computed elsewhere (e.g. by local search) so it is not recomputed.
+
+        ``penalty`` is applied as in :meth:`scores`.
+        """
+        if self.penalty is not None:
+            score -= self.penalty([individual])[0]
+        self._scores[tuple(individual)] = score
+        self._scores.move_to_end(tuple(individual))
+        while len(self._scores) > self.max_size:
+            self._scores.popitem(last=False)
+
+    def stats(self):
+        return {"evaluations": self.evaluations, "avoided": self.hits, "cached": len(self._scores)}
+
+
+def elite_indices(scores):
+    """Indices of the top 20% of ``scores``, best first."""
+    order = sorted(range(len(scores)), key=scores.__getitem__, reverse=True)
+    return order[:int(0.2 * len(scores))]
+
+
+def selection(model, population, scores=None):
+    if scores is None:
+        scores = evaluate_population(model, population)
+    return [population[i] for i in elite_indices(scores)]
+
+
+def crossover(p1, p2, rng=random):
+    point = rng.randint(1, len(p1) - 1)
+    return p1[:point] + p2[point:]
+
+
+def mutate(model, individual, mutation_rate=MUTATION_RATE, rng=random, unconstrained_share=UNCONSTRAINED_SHARE):
+    for c in range(len(individual)):
+        if rng.random() < mutation_rate:
+            individual[c] = random_gene(model, c, rng, unconstrained_share)
+    return individual
+
+
+def genetic_algorithm(
+    model,
+    population_size=POPULATION_SIZE,
+    generations=GENERATIONS,
+    mutation_rate=MUTATION_RATE,
+    rng=random,
+    vectorized=VECTORIZED_FITNESS,
+    cache=None,
+    progress=print_progress,
+    stopping=None,
+    unconstrained_share=UNCONSTRAINED_SHARE,
+    local_search=None,
+    local_search_time=LOCAL_SEARCH_TIME,
+    seeded_fraction=SEEDED_FRACTION,
+    initial=None,
+):
+    """Evolve a timetable for ``model`` and return a :class:`GAResult`.
+
+    The run ends after ``generations`` or earlier when ``stopping`` (a
+    :class:`StoppingCriteria`) says so; ``GAResult.stop_reason`` records why.
+
+    Every generation is scored in one batch through ``cache``.
+
+    With ``local_search`` set to ``'steepest'`` or ``'tabu'`` the elites of
+    every generation are repaired for up to ``local_search_time`` seconds
+    before breeding (see :mod:`local_search`).
+
+    ``seeded_fraction`` of the initial population is built constructively
+    by DSatur instead of at random. ``initial`` replaces the initial
+    population altogether, e.g. to warm-start from an existing timetable.
+
+    ``progress`` receives one event dict per generation (best, mean and
+    spread of the scores, the best timetable's hard violations and the
+    seconds spent in each phase) and a summary of fitness evaluations, phase
+    timings and the result at the end; raising from it aborts the run.
+    """
+    started = time.monotonic()
+    timer = PhaseTimer()
+    clock = time.perf_counter()
+    if stopping is None:
+        stopping = StoppingCriteria()
+    if cache is None:
+        cache = FitnessCache(model, vectorized=vectorized)
+    if initial is not None:
+        population, seeded, seeding_seconds = [list(ind) for ind in initial], 0, 0.0
+    else:
+        population, seeded, seeding_seconds = initial_population(
+            model, population_size, rng, unconstrained_share, seeded_fraction)
+    timer.add('init', time.perf_counter() - clock)
+    clock = time.perf_counter()
+    scores = cache.scores(population)
+    timer.add('fitness', time.perf_counter() - clock)
+    timer.lap()
+    if seeded:
+        progress(seeding_event(model.dept_code, scores, seeded, seeding_seconds))
+    best = None
+    best_score = float('-inf')
+    best_violations = None
+    stalled = 0
+    stop_reason = 'generation_cap'
+    generations_run = 0
+    for gen in range(generations):
+        clock = time.perf_counter()
+        elite = elite_indices(scores)
+        selected = [population[i] for i in elite]
+        timer.add('selection', time.perf_counter() - clock)
+        if local_search:
+            clock = time.perf_counter()
+            selected, repaired, repair_stats = repair_elites(model, selected, local_search, local_search_time, rng)
+            for individual, scorer in zip(selected, repaired):
+                if scorer is not None:
+                    cache.store(individual, scorer.score)
+            timer.add('local_search', time.perf_counter() - clock)
+            progress({"type": "local_search", "dept": model.dept_code, "generation": gen + 1, **repair_stats})
+        next_pop = selected[:]
+        crossover_seconds = mutation_seconds = 0.0
+        while len(next_pop) < population_size:
+            clock = time.perf_counter()
+            i1, i2 = rng.sample(range(len(selected)), 2)
+            child = crossover(selected[i1], selected[i2], rng)
+            mutated = time.perf_counter()
+            child = mutate(model, child, mutation_rate, rng, unconstrained_share)
+            done = time.perf_counter()
+            crossover_seconds += mutated - clock
+            mutation_seconds += done - mutated
+            next_pop.append(child)
+        timer.add('crossover', crossover_seconds)
+        timer.add('mutation', mutation_seconds)
+        population = next_pop
+        clock = time.perf_counter()
+        scores = cache.scores(population)
+        timer.add('fitness', time.perf_counter() - clock)
+        best_idx = max(range(len(population)), key=scores.__getitem__)
+        current_best, current_score = population[best_idx], scores[best_idx]
+        current_violations = hard_violations(model, current_best)
+        mean_score = sum(scores) / len(scores)
+        progress({"type": "generation", "dept": model.dept_code,
+                  "generation": gen + 1, "best_score": current_score,
+                  "mean_score": round(mean_score, 3),
+                  "score_std": round((sum((s - mean_score) ** 2 for s in scores) / len(scores)) ** 0.5, 3),
+                  "hard_violations": current_violations,
+                  "evaluations": cache.evaluations,
+                  "timings": timer.lap()})
+        generations_run = gen + 1
+        if current_score > best_score:
+            best = current_best
+            best_score = current_score
+            best_violations = current_violations
+            stalled = 0
+        else:
+            stalled += 1
+        reason = stopping.check(time.monotonic() - started, stalled, best_score, best_violations)
+        if reason is not None:
+            stop_reason = reason
+            break
+    stats = cache.stats()
+    progress({"type": "evaluations", "dept": model.dept_code,
+              "evaluations": stats['evaluations'], "avoided": stats['avoided']})
+    result = GAResult(
+        best=best,
+        best_score=best_score,
+        hard_violations=hard_violations(model, best) if best is not None else None,
+        generations=generations_run,
+        stop_reason=stop_reason,
+        elapsed=time.monotonic() - started,
+        timings=timer.summary(),
+    )
+    progress({"type": "timings", "dept": model.dept_code, **result.timings})
+    progress(result.event(model.dept_code))
+    return result
+
+
+def decode_individual(model, individual):
+    """Translate a compiled timetable back to ``(course_id, timeslot_id, room_id, professor_id)`` genes."""
+    return [
+        (
+            model.course_ids[c],
+            model.timeslot_ids[ts],
+            model.room_ids[room],
+            model.professor_ids[prof] if prof != NO_PROFESSOR else None,
+        )
+        for c, (ts, room, prof) in enumerate(individual)
+    ]
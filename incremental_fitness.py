@@ -0,0 +1,166 @@
+from problem_model import NO_PROFESSOR
+from vectorized_fitness import batch_fitness, population_to_array
+
+
+def _bump(counter, key, step, first, repeat):
+    """Add (step=1) or remove (step=-1) one occupant of ``key`` and return the score change.
+
+    ``first`` is the score of the first occupant of a key, ``repeat`` the
+    score of every further occupant (a clash).
+    """
+    if step > 0:
+        k = counter.get(key, 0)
+        counter[key] = k + 1
+        return first if k == 0 else repeat
+    k = counter[key] - 1
+    if k:
+        counter[key] = k
+    else:
+        del counter[key]
+    return -(first if k == 0 else repeat)
+
+
+def _load_penalty(load, max_load):
+    return (load - max_load) * 10 if load > 0 and load > max_load else 0
+
+
+class IncrementalScorer:
+    """Fitness of one timetable, kept up to date as genes move.
+
+    The scorer keeps occupancy counters for (room, timeslot),
+    (professor, timeslot) and (student, timeslot) plus professor loads, so
+    moving a gene costs O(students of that course) instead of a full
+    re-score. With ``check`` set the score is compared against a full
+    recompute after every move and placement.
+    """
+
+    def __init__(self, model, individual, check=False):
+        self.model = model
+        self.check = check
+        self.genes = list(individual)
+        # Reserved slots start with one occupant, so using one scores as a clash
+        self.room_time = dict.fromkeys(model.reserved_room_slots, 1)
+        self.prof_time = {}
+        self.student_time = {}
+        self.prof_load = [0] * model.n_professors
+        self.moves = 0
+        self.score = 0
+        for c, gene in enumerate(self.genes):
+            self.score += self._apply(c, gene, 1)
+        self._verify()
+
+    def _apply(self, c, gene, step):
+        model = self.model
+        ts, room, prof = gene
+        bit = 1 << ts
+
+        delta = 1 if model.room_ok_bits[c] >> room & 1 else -5
+        if model.preferred_bits[c] & bit:
+            delta += 3
+        if prof != NO_PROFESSOR:
+            delta += 2 if model.prof_avail_bits[prof] & bit else -8
+        else:
+            delta -= 5
+        delta *= step
+
+        delta += _bump(self.room_time, room * model.n_timeslots + ts, step, 2, -10)
+        if prof != NO_PROFESSOR:
+            delta += _bump(self.prof_time, prof * model.n_timeslots + ts, step, 0, -15)
+            load = self.prof_load[prof]
+            self.prof_load[prof] = load + step
+            max_load = model.max_load[prof]
+            delta += _load_penalty(load, max_load) - _load_penalty(load + step, max_load)
+        # Student clashes, inlined: this is the loop that dominates large departments
+        student_time = self.student_time
+        n_timeslots = model.n_timeslots
+        clashes = 0
+        if step > 0:
+            for stu in model.course_students[c]:
+                key = stu * n_timeslots + ts
+                k = student_time.get(key, 0)
+                student_time[key] = k + 1
+                if k:
+                    clashes += 1
+        else:
+            for stu in model.course_students[c]:
+                key = stu * n_timeslots + ts
+                k = student_time[key] - 1
+                if k:
+                    student_time[key] = k
+                    clashes += 1
+                else:
+                    del student_time[key]
+        return delta - 15 * clashes * step
+
+    def move(self, c, gene):
+        """Replace gene ``c`` with ``gene`` and return the new score."""
+        old = self.genes[c]
+        if old != gene:
+            self.score += self._apply(c, old, -1) + self._apply(c, gene, 1)
+            self.genes[c] = gene
+            self.moves += 1
+            self._verify()
+        return self.score
+
+    def lift(self, c):
+        """Take gene ``c`` out of the counters, leaving ``genes[c]`` as is; returns the score change."""
+        delta = self._apply(c, self.genes[c], -1)
+        self.score += delta
+        return delta
+
+    def place(self, c, gene):
+        """Put a lifted gene ``c`` back as ``gene``; returns the score change."""
+        delta = self._apply(c, gene, 1)
+        self.score += delta
+        if gene != self.genes[c]:
+            self.genes[c] = gene
+            self.moves += 1
+        self._verify()
+        return delta
+
+    def placement_delta(self, c, gene):
+        """Score change of placing lifted gene ``c`` as ``gene``, without keeping it."""
+        delta = self._apply(c, gene, 1)
+        self._apply(c, gene, -1)
+        return delta
+
+    def gene_conflicts(self, c):
+        """Whether gene ``c`` takes part in any hard-constraint violation."""
+        model = self.model
+        ts, room, prof = self.genes[c]
+        n_timeslots = model.n_timeslots
+        if not model.room_ok_bits[c] >> room & 1:
+            return True
+        if self.room_time[room * n_timeslots + ts] > 1:
+            return True
+        if prof != NO_PROFESSOR:
+            if not model.prof_avail_bits[prof] >> ts & 1:
+                return True
+            if self.prof_time[prof * n_timeslots + ts] > 1:
+                return True
+            if self.prof_load[prof] > model.max_load[prof]:
+                return True
+        student_time = self.student_time
+        return any(student_time[stu * n_timeslots + ts] > 1 for stu in model.course_students[c])
+
+    def hard_violations(self):
+        """Same count as ``ga_engine.hard_violations``, read off the counters."""
+        model = self.model
+        violations = sum(k - 1 for k in self.room_time.values())
+        violations += sum(k - 1 for k in self.prof_time.values())
+        violations += sum(k - 1 for k in self.student_time.values())
+        violations += sum(max(load - max_load, 0) for load, max_load in zip(self.prof_load, model.max_load))
+        for c, (ts, room, prof) in enumerate(self.genes):
+            if not model.room_ok_bits[c] >> room & 1:
+                violations += 1
+            if prof != NO_PROFESSOR and not model.prof_avail_bits[prof] >> ts & 1:
+                violations += 1
+        return violations
+
+    def _verify(self):
+        if not self.check:
+            return
+        full = int(batch_fitness(self.model, population_to_array([self.genes]))[0])
+        if full != self.score:
+            raise AssertionError(
+                f"[{self.model.dept_code}] incremental score {self.score} != full recompute {full}")
@@ -0,0 +1,167 @@
+import time
+from collections import defaultdict
+from dataclasses import asdict, replace
+
+from ga_engine import GAResult, decode_individual, print_progress
+from local_search import LOCAL_SEARCH_TIME, repair_elites
+from parallel_scheduling import WORKERS, department_rng, schedule_departments
+from problem_model import compile_department
+
+# How departments share the institution's rooms:
+#   'independent' - every department books rooms on its own (clashes are only reported)
+#   'sequential'  - departments run one after another, each against the rooms booked before it
+#                   (so workers > 1 has no effect)
+#   'parallel'    - departments run independently (in parallel with workers > 1), then each
+#                   timetable is repaired in turn against the rooms booked before it
+ROOM_SHARING_MODES = ('independent', 'sequential', 'parallel')
+ROOM_SHARING = 'parallel'
+# Seconds of local search per department when repairing against reservations in 'parallel' mode
+RESERVATION_REPAIR_TIME = 10 * LOCAL_SEARCH_TIME
+
+
+def department_order(courses_df):
+    """Departments with the most courses first, so the hardest ones get first pick of rooms."""
+    sizes = courses_df.groupby('dept_code', observed=True).size()
+    return sorted(sizes.index, key=lambda dept: (-sizes[dept], str(dept)))
+
+
+def room_bookings(schedule):
+    """The ``(room_id, timeslot_id)`` pairs a decoded timetable occupies."""
+    return {(room, ts) for _, ts, room, _ in schedule}
+
+
+def room_conflicts(schedules):
+    """Find rooms booked by more than one department in the same timeslot.
+
+    ``schedules`` maps each department to its decoded timetable (see
+    :func:`ga_engine.decode_individual`). Returns one entry per clashing
+    (room, timeslot) listing every department and course booked there.
+    """
+    bookings = defaultdict(list)
+    for dept, schedule in schedules.items():
+        for course_id, ts, room, _ in schedule:
+            bookings[(room, ts)].append({"dept": dept, "course_id": course_id})
+    conflicts = []
+    for (room, ts), courses in bookings.items():
+        if len({booking["dept"] for booking in courses}) > 1:
+            conflicts.append({"room_id": room, "timeslot_id": ts, "bookings": courses})
+    return sorted(conflicts, key=lambda conflict: (str(conflict["room_id"]), str(conflict["timeslot_id"])))
+
+
+def _cached_result(cache, key):
+    value = cache.get(key) if cache is not None else None
+    if value is None:
+        return None
+    return GAResult(**{**value, "best": [tuple(gene) for gene in value["best"]]})
+
+
+def _cache_result(cache, key, result):
+    if cache is not None:
+        cache.put(key, {**asdict(result), "best": [[int(v) for v in gene] for gene in result.best]})
+
+
+def schedule_institution(
+    frames,
+    departments=None,
+    mode=ROOM_SHARING,
+    workers=WORKERS,
+    seed=None,
+    islands=1,
+    island_options=None,
+    progress=print_progress,
+    repair_time=RESERVATION_REPAIR_TIME,
+    scheduled=None,
+    cache=None,
+    cache_key=None,
+    **ga_kwargs,
+):
+    """Schedule every department against one institution-wide room reservation table.
+
+    ``frames`` are the eight input DataFrames in ``compile_department``
+    order. ``departments`` defaults to :func:`department_order`.
+    ``scheduled`` maps departments whose timetables are already fixed to
+    their decoded timetables; their rooms count as reserved and they are
+    included in the conflict report. Returns
+    ``(models, results, conflicts)``: the compiled model and
+    :class:`GAResult` per department and the cross-department room
+    conflicts left in the final timetables, which are also sent to
+    ``progress`` as a ``room_conflicts`` event.
+
+    With a ``cache`` (see :class:`result_cache.ResultCache`) each
+    department's result is looked up before it is scheduled, under
+    ``cache_key(dept, reserved, stage)``: the rooms reserved when it runs
+    and the stage, ``'ga'`` or (in ``'parallel'`` mode) ``'repair'``.
+    """
+    if mode not in ROOM_SHARING_MODES:
+        raise ValueError(f"Unknown room sharing mode: {mode!r} (expected one of {ROOM_SHARING_MODES})")
+    if departments is None:
+        departments = department_order(frames[0])
+    options = dict(workers=workers, seed=seed, islands=islands, island_options=island_options,
+                   progress=progress, **ga_kwargs)
+
+    def lookup(dept, reserved, stage):
+        if cache is None:
+            return None, None
+        key = cache_key(dept, reserved, stage)
+        result = _cached_result(cache, key)
+        if result is not None:
+            progress({"type": "cache", "dept": dept, "status": "hit"})
+        return key, result
+
+    scheduled = dict(scheduled or {})
+    models, results = {}, {}
+    reserved = set()
+    if mode != 'independent':
+        for schedule in scheduled.values():
+            reserved |= room_bookings(schedule)
+    if mode == 'sequential':
+        if workers is not None and workers > 1 and len(departments) > 1:
+            progress({"type": "warning", "dept": "*",
+                      "message": f"sequential room sharing runs one department at a time, ignoring workers={workers}"})
+        for dept in departments:
+            models[dept] = compile_department(dept, *frames, reserved_rooms=reserved)
+            key, results[dept] = lookup(dept, reserved, 'ga')
+            if results[dept] is None:
+                results.update(schedule_departments([models[dept]], **options))
+                _cache_result(cache, key, results[dept])
+            reserved |= room_bookings(decode_individual(models[dept], results[dept].best))
+    else:
+        models = {dept: compile_department(dept, *frames) for dept in departments}
+        # Nothing is reserved while the GA runs in these modes
+        keys = {}
+        for dept in departments:
+            keys[dept], cached = lookup(dept, set(), 'ga')
+            if cached is not None:
+                results[dept] = cached
+        pending = [models[dept] for dept in departments if dept not in results]
+        for dept, result in (schedule_departments(pending, **options) if pending else {}).items():
+            results[dept] = result
+            _cache_result(cache, keys[dept], result)
+
+    if mode == 'parallel':
+        for dept in departments:
+            model = compile_department(dept, *frames, reserved_rooms=reserved)
+            key, cached = lookup(dept, reserved, 'repair')
+            if cached is not None:
+                results[dept] = cached
+            else:
+                rng = department_rng(seed, f"{dept}:reservations")
+                started = time.monotonic()
+                repaired, scorers, stats = repair_elites(model, [results[dept].best], 'steepest', repair_time, rng)
+                scorer = scorers[0]
+                results[dept] = replace(results[dept], best=repaired[0], best_score=scorer.score,
+                                        hard_violations=scorer.hard_violations(),
+                                        elapsed=results[dept].elapsed + time.monotonic() - started)
+                _cache_result(cache, key, results[dept])
+                # The GA already reported this department's result; this updates it
+                progress({"type": "repair", "dept": dept, "best_score": scorer.score,
+                          "hard_violations": scorer.hard_violations(), "elapsed": round(results[dept].elapsed, 3),
+                          "moves": stats["moves"], "hard_violations_before": stats["hard_violations_before"]})
+            models[dept] = model
+            reserved |= room_bookings(decode_individual(model, results[dept].best))
+
+    for dept in departments:
+        scheduled[dept] = decode_individual(models[dept], results[dept].best)
+    conflicts = room_conflicts(scheduled)
+    progress({"type": "room_conflicts", "dept": "*", "mode": mode, "conflicts": conflicts})
+    return models, results, conflicts
@@ -0,0 +1,260 @@
+import multiprocessing
+import random
+import time
+
+from ga_engine import (
+    GENERATIONS,
+    MUTATION_RATE,
+    POPULATION_SIZE,
+    VECTORIZED_FITNESS,
+    FitnessCache,
+    GAResult,
+    StoppingCriteria,
+    UNCONSTRAINED_SHARE,
+    crossover,
+    hard_violations,
+    initial_population,
+    mutate,
+    print_progress,
+    seeding_event,
+    selection,
+)
+from constructive_seeding import SEEDED_FRACTION
+from local_search import LOCAL_SEARCH_TIME, repair_elites
+
+ISLANDS = 4
+MIGRATION_INTERVAL = 10
+MIGRATION_SIZE = 2
+TOPOLOGIES = ('ring', 'complete', 'random')
+
+
+class Island:
+    """One sub-population evolved with the standard selection/crossover/mutate operators."""
+
+    def __init__(self, model, population_size, mutation_rate, rng, vectorized=VECTORIZED_FITNESS,
+                 unconstrained_share=UNCONSTRAINED_SHARE, local_search=None, local_search_time=LOCAL_SEARCH_TIME,
+                 seeded_fraction=SEEDED_FRACTION):
+        self.model = model
+        self.population_size = population_size
+        self.mutation_rate = mutation_rate
+        self.rng = rng
+        self.unconstrained_share = unconstrained_share
+        self.local_search = local_search
+        self.local_search_time = local_search_time
+        self.cache = FitnessCache(model, vectorized=vectorized)
+        self.population, seeded, seconds = initial_population(
+            model, population_size, rng, unconstrained_share, seeded_fraction)
+        self.scores = self.cache.scores(self.population)
+        self.seeding = seeding_event(model.dept_code, self.scores, seeded, seconds) if seeded else None
+        self.best = None
+        self.best_score = float('-inf')
+        self._track_best()
+
+    def _track_best(self):
+        best_idx = max(range(len(self.population)), key=self.scores.__getitem__)
+        if self.scores[best_idx] > self.best_score:
+            self.best = self.population[best_idx]
+            self.best_score = self.scores[best_idx]
+
+    def evolve(self, generations):
+        for _ in range(generations):
+            selected = selection(self.model, self.population, self.scores)
+            if self.local_search:
+                selected, repaired, _ = repair_elites(
+                    self.model, selected, self.local_search, self.local_search_time, self.rng)
+                for individual, scorer in zip(selected, repaired):
+                    if scorer is not None:
+                        self.cache.store(individual, scorer.score)
+            next_pop = selected[:]
+            while len(next_pop) < self.population_size:
+                p1, p2 = self.rng.sample(selected, 2)
+                child = crossover(p1, p2, self.rng)
+                child = mutate(self.model, child, self.mutation_rate, self.rng, self.unconstrained_share)
+                next_pop.append(child)
+            self.population = next_pop
+            self.scores = self.cache.scores(self.population)
+            self._track_best()
+
+    def emigrants(self, count):
+        order = sorted(range(len(self.population)), key=self.scores.__getitem__, reverse=True)
+        return [list(self.population[i]) for i in order[:count]]
+
+    def immigrate(self, migrants):
+        """Replace the worst individuals with ``migrants``."""
+        if not migrants:
+            return
+        order = sorted(range(len(self.population)), key=self.scores.__getitem__)
+        for i, migrant in zip(order, migrants):
+            self.population[i] = migrant
+        self.scores = self.cache.scores(self.population)
+        self._track_best()
+
+
+def migration_routes(topology, n_islands, rng):
+    """Map each island to the islands its emigrants are sent to."""
+    if topology == 'ring':
+        return {i: [(i + 1) % n_islands] for i in range(n_islands)}
+    if topology == 'complete':
+        return {i: [j for j in range(n_islands) if j != i] for i in range(n_islands)}
+    if topology == 'random':
+        return {i: [rng.choice([j for j in range(n_islands) if j != i])] for i in range(n_islands)}
+    raise ValueError(f"Unknown migration topology: {topology!r} (expected one of {TOPOLOGIES})")
+
+
+def _island_rng(seed, dept_code, island_id):
+    if seed is None:
+        return random.Random()
+    return random.Random(f"{seed}:{dept_code}:island{island_id}")
+
+
+def _island_worker(conn, model, island_id, seed, population_size, mutation_rate, vectorized,
+                   unconstrained_share, local_search, local_search_time, seeded_fraction):
+    island = Island(model, population_size, mutation_rate, _island_rng(seed, model.dept_code, island_id),
+                    vectorized, unconstrained_share, local_search, local_search_time, seeded_fraction)
+    conn.send(island.seeding)
+    while True:
+        command, generations, migrants, count = conn.recv()
+        if command == 'stop':
+            conn.send((island.best, island.best_score))
+            break
+        island.immigrate(migrants)
+        island.evolve(generations)
+        conn.send((island.emigrants(count), island.best_score, island.best))
+    conn.close()
+
+
+class _LocalIsland:
+    """In-process stand-in for an island worker, same protocol without a pipe."""
+
+    def __init__(self, model, island_id, seed, population_size, mutation_rate, vectorized,
+                 unconstrained_share, local_search, local_search_time, seeded_fraction):
+        self.island = Island(model, population_size, mutation_rate, _island_rng(seed, model.dept_code, island_id),
+                             vectorized, unconstrained_share, local_search, local_search_time, seeded_fraction)
+        self._reply = self.island.seeding
+
+    def send(self, message):
+        command, generations, migrants, count = message
+        if command == 'stop':
+            self._reply = (self.island.best, self.island.best_score)
+        else:
+            self.island.immigrate(migrants)
+            self.island.evolve(generations)
+            self._reply = (self.island.emigrants(count), self.island.best_score, self.island.best)
+
+    def recv(self):
+        return self._reply
+
+
+def island_genetic_algorithm(
+    model,
+    islands=ISLANDS,
+    migration_interval=MIGRATION_INTERVAL,
+    migration_size=MIGRATION_SIZE,
+    topology='ring',
+    population_size=POPULATION_SIZE,
+    generations=GENERATIONS,
+    mutation_rate=MUTATION_RATE,
+    seed=None,
+    processes=True,
+    vectorized=VECTORIZED_FITNESS,
+    progress=print_progress,
+    stopping=None,
+    unconstrained_share=UNCONSTRAINED_SHARE,
+    local_search=None,
+    local_search_time=LOCAL_SEARCH_TIME,
+    seeded_fraction=SEEDED_FRACTION,
+):
+    """Evolve ``islands`` sub-populations and return a :class:`GAResult` for the best timetable.
+
+    Every ``migration_interval`` generations each island sends copies of its
+    ``migration_size`` best timetables along the ``topology`` routes, where
+    they replace the receiver's worst. With ``processes`` each island runs in
+    its own process and only migrants cross process boundaries. ``stopping``
+    is checked at every migration, so it acts at ``migration_interval``
+    granularity.
+    """
+    started = time.monotonic()
+    if stopping is None:
+        stopping = StoppingCriteria()
+    if islands < 2:
+        raise ValueError("Island mode needs at least 2 islands")
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"Unknown migration topology: {topology!r} (expected one of {TOPOLOGIES})")
+    route_rng = _island_rng(seed, model.dept_code, 'routes')
+    args = (population_size, mutation_rate, vectorized, unconstrained_share, local_search, local_search_time,
+            seeded_fraction)
+
+    workers = []
+    if processes:
+        for i in range(islands):
+            parent_conn, child_conn = multiprocessing.Pipe()
+            proc = multiprocessing.Process(
+                target=_island_worker, args=(child_conn, model, i, seed) + args, daemon=True)
+            proc.start()
+            workers.append((parent_conn, proc))
+    else:
+        workers = [(_LocalIsland(model, i, seed, *args), None) for i in range(islands)]
+
+    results = None
+    try:
+        # Each island first reports how its initial population was seeded
+        for i, (conn, _) in enumerate(workers):
+            seeding = conn.recv()
+            if seeding is not None:
+                progress({**seeding, "island": i})
+        inbox = [[] for _ in range(islands)]
+        done = 0
+        best, best_score, best_violations = None, float('-inf'), None
+        stalled = 0
+        stop_reason = 'generation_cap'
+        while done < generations:
+            step = min(migration_interval, generations - done)
+            for i, (conn, _) in enumerate(workers):
+                conn.send(('evolve', step, inbox[i], migration_size))
+            replies = [conn.recv() for conn, _ in workers]
+            done += step
+
+            inbox = [[] for _ in range(islands)]
+            for source, targets in migration_routes(topology, islands, route_rng).items():
+                for target in targets:
+                    inbox[target].extend(list(ind) for ind in replies[source][0])
+            island_scores = [score for _, score, _ in replies]
+            progress({"type": "generation", "dept": model.dept_code, "generation": done,
+                      "best_score": max(island_scores), "island_scores": island_scores})
+
+            _, epoch_score, epoch_best = max(replies, key=lambda reply: reply[1])
+            if epoch_score > best_score:
+                best, best_score = epoch_best, epoch_score
+                best_violations = hard_violations(model, best) if stopping.stop_when_feasible else None
+                stalled = 0
+            else:
+                stalled += step
+            reason = stopping.check(time.monotonic() - started, stalled, best_score, best_violations)
+            if reason is not None:
+                stop_reason = reason
+                break
+
+        for conn, _ in workers:
+            conn.send(('stop', 0, [], 0))
+        results = [conn.recv() for conn, _ in workers]
+    finally:
+        for conn, proc in workers:
+            if proc is not None:
+                if results is None:
+                    # Aborted mid-run (e.g. cancelled from ``progress``): don't wait on the islands
+                    proc.terminate()
+                proc.join(timeout=5)
+                if proc.is_alive():
+                    proc.terminate()
+
+    best, best_score = max(results, key=lambda result: result[1])
+    result = GAResult(
+        best=best,
+        best_score=best_score,
+        hard_violations=hard_violations(model, best),
+        generations=done,
+        stop_reason=stop_reason,
+        elapsed=time.monotonic() - started,
+    )
+    progress(result.event(model.dept_code))
+    return result
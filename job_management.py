@@ -0,0 +1,202 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from telemetry import REPAIRED_RESULT
+
+router = APIRouter()
+
+MAX_CONCURRENT_JOBS = 2
+MAX_PENDING_JOBS = 8
+MAX_FINISHED_JOBS = 100
+EVENT_POLL_SECONDS = 0.25
+
+FINISHED_STATES = ('completed', 'failed', 'cancelled')
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self):
+        self.id = str(uuid.uuid4())
+        self.status = 'queued'
+        self.events = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_requested = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    def report(self, event):
+        """Progress callback handed to the scheduler; aborts the run once cancellation is requested."""
+        if self.cancel_requested.is_set():
+            raise JobCancelled()
+        self.events.append(event)
+
+    def summary(self):
+        latest = next((e for e in reversed(self.events) if e.get('type') == 'generation'), None)
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "progress": latest,
+            "results": self.results(),
+            "dataset_id": next((e['dataset_id'] for e in self.events if e.get('type') == 'dataset'), None),
+            "room_conflicts": next((e['conflicts'] for e in reversed(self.events)
+                                    if e.get('type') == 'room_conflicts'), None),
+            "timings": self.timings(),
+        }
+
+    def results(self):
+        """The ``result`` event of each department, updated by its ``repair`` event if any."""
+        results = {}
+        for event in self.events:
+            if event.get('type') == 'result':
+                results[event['dept']] = event
+            elif event.get('type') == 'repair' and event['dept'] in results:
+                results[event['dept']] = {**results[event['dept']],
+                                          **{key: event[key] for key in REPAIRED_RESULT}}
+        return results
+
+    def timings(self):
+        """Seconds per GA phase for each department, merged from its ``timings`` events."""
+        timings = {}
+        for event in self.events:
+            if event.get('type') == 'timings':
+                phases = timings.setdefault(event['dept'], {})
+                for phase, seconds in event.items():
+                    if phase not in ('type', 'dept'):
+                        phases[phase] = phases.get(phase, 0.0) + seconds
+        return timings
+
+
+class JobManager:
+    """Runs scheduling jobs on a bounded thread pool so the event loop stays free."""
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT_JOBS, max_pending=MAX_PENDING_JOBS,
+                 max_finished=MAX_FINISHED_JOBS):
+        self.max_active = max_concurrent + max_pending
+        self.max_finished = max_finished
+        self.jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix='ga-job')
+
+    def submit(self, fn, *args):
+        """Queue ``fn(*args, progress=...)`` as a job."""
+        with self._lock:
+            active = sum(1 for job in self.jobs.values() if not job.finished)
+            if active >= self.max_active:
+                raise HTTPException(status_code=429, detail="Too many scheduling jobs in progress, try again later")
+            job = Job()
+            self.jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def _run(self, job, fn, args):
+        try:
+            if job.cancel_requested.is_set():
+                raise JobCancelled()
+            job.status = 'running'
+            job.started_at = time.time()
+            job.result = fn(*args, progress=job.report)
+            job.status = 'completed'
+        except JobCancelled:
+            job.status = 'cancelled'
+        except Exception as exc:
+            job.error = str(exc)
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+            self._prune()
+
+    def _prune(self):
+        with self._lock:
+            finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+            for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+                del self.jobs[job_id]
+
+    def get(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if not job.finished:
+            job.cancel_requested.set()
+        return job
+
+
+job_manager = JobManager()
+
+
+async def _event_stream(job):
+    sent = 0
+    while True:
+        events = job.events[sent:]
+        for event in events:
+            yield f"event: {event.get('type', 'message')}\ndata: {json.dumps(event, default=str)}\n\n"
+        sent += len(events)
+        if job.finished and sent >= len(job.events):
+            yield f"event: end\ndata: {json.dumps(job.summary(), default=str)}\n\n"
+            return
+        await asyncio.sleep(EVENT_POLL_SECONDS)
+
+
+@router.get("/jobs")
+def list_jobs():
+    return [job.summary() for job in list(job_manager.jobs.values())]
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    return job_manager.get(job_id).summary()
+
+
+@router.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    job = job_manager.get(job_id)
+    if job.status == 'failed':
+        raise HTTPException(status_code=500, detail=f"Job failed: {job.error}")
+    if job.status != 'completed':
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return JSONResponse(content=job.result)
+
+
+@router.get("/jobs/{job_id}/profile")
+def get_job_profile(job_id: str):
+    job = job_manager.get(job_id)
+    profile = next((e for e in job.events if e.get('type') == 'profile'), None)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="No profile for this job, upload with ?profile=true")
+    return profile
+
+
+@router.get("/jobs/{job_id}/events")
+def stream_job_events(job_id: str):
+    job = job_manager.get(job_id)
+    return StreamingResponse(_event_stream(job), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+
+@router.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    return job_manager.cancel(job_id).summary()
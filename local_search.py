@@ -0,0 +1,144 @@
+import random
+import time
+
+from incremental_fitness import IncrementalScorer
+from problem_model import NO_PROFESSOR
+
+LOCAL_SEARCH_METHODS = ('steepest', 'tabu')
+# Wall-clock seconds of repair per generation, shared by all elites
+LOCAL_SEARCH_TIME = 0.05
+TABU_TENURE = 10
+
+
+def _candidates(scorer, c, rng):
+    """One candidate gene per timeslot for lifted gene ``c``.
+
+    Each candidate keeps the current room and professor when they are free
+    (and, for the professor, available) in that timeslot, and otherwise
+    takes the first free one from the course's domain.
+    """
+    model = scorer.model
+    n_timeslots = model.n_timeslots
+    room_time, prof_time = scorer.room_time, scorer.prof_time
+    _, cur_room, cur_prof = scorer.genes[c]
+    rooms = model.candidate_rooms[c]
+    profs = model.candidate_profs
+    room_offset = rng.randrange(len(rooms))
+    prof_offset = rng.randrange(len(profs)) if profs else 0
+
+    for ts in range(n_timeslots):
+        room = cur_room
+        if room_time.get(room * n_timeslots + ts, 0) or not model.room_ok_bits[c] >> room & 1:
+            for i in range(len(rooms)):
+                r = rooms[(room_offset + i) % len(rooms)]
+                if not room_time.get(r * n_timeslots + ts, 0):
+                    room = r
+                    break
+
+        prof = cur_prof
+        if prof != NO_PROFESSOR and (prof_time.get(prof * n_timeslots + ts, 0)
+                                     or not model.prof_avail_bits[prof] >> ts & 1):
+            for i in range(len(profs)):
+                p = profs[(prof_offset + i) % len(profs)]
+                if model.prof_avail_bits[p] >> ts & 1 and not prof_time.get(p * n_timeslots + ts, 0):
+                    prof = p
+                    break
+        yield (ts, room, prof)
+
+
+def _best_move(scorer, c, rng, tabu=None, iteration=0, aspiration=None):
+    """Lift gene ``c``, place it at its best candidate and return the score change.
+
+    Steepest descent (``tabu`` is None) only moves when that improves the
+    score. Tabu search always moves to the best non-tabu candidate, where a
+    tabu candidate is allowed if it would beat ``aspiration``.
+    """
+    current = scorer.genes[c]
+    lifted = scorer.lift(c)
+    stay = scorer.placement_delta(c, current)
+    best_gene, best_delta = current, stay if tabu is None else float('-inf')
+    for gene in _candidates(scorer, c, rng):
+        if gene == current:
+            continue
+        delta = scorer.placement_delta(c, gene)
+        if tabu is not None and tabu.get((c, gene[0]), -1) > iteration:
+            if aspiration is None or scorer.score + delta <= aspiration:
+                continue
+        if delta > best_delta:
+            best_gene, best_delta = gene, delta
+    if best_delta == float('-inf'):
+        best_gene, best_delta = current, stay
+    scorer.place(c, best_gene)
+    return lifted + best_delta
+
+
+def repair(scorer, method='steepest', deadline=None, rng=random, tabu_tenure=TABU_TENURE):
+    """Move conflicting genes of ``scorer``'s timetable to better slots until ``deadline``.
+
+    Returns the (possibly new) scorer holding the repaired timetable.
+    """
+    if method not in LOCAL_SEARCH_METHODS:
+        raise ValueError(f"Unknown local search method: {method!r} (expected one of {LOCAL_SEARCH_METHODS})")
+    n_courses = scorer.model.n_courses
+
+    if method == 'steepest':
+        improved = True
+        while improved:
+            improved = False
+            conflicts = [c for c in range(n_courses) if scorer.gene_conflicts(c)]
+            rng.shuffle(conflicts)
+            for c in conflicts:
+                if deadline is not None and time.monotonic() >= deadline:
+                    return scorer
+                if _best_move(scorer, c, rng) > 0:
+                    improved = True
+        return scorer
+
+    tabu = {}
+    best_genes, best_score = list(scorer.genes), scorer.score
+    iteration = 0
+    while deadline is None or time.monotonic() < deadline:
+        conflicts = [c for c in range(n_courses) if scorer.gene_conflicts(c)]
+        if not conflicts:
+            break
+        c = rng.choice(conflicts)
+        old_ts = scorer.genes[c][0]
+        _best_move(scorer, c, rng, tabu, iteration, aspiration=best_score)
+        tabu[(c, old_ts)] = iteration + tabu_tenure
+        iteration += 1
+        if scorer.score > best_score:
+            best_genes, best_score = list(scorer.genes), scorer.score
+        if deadline is None and iteration >= tabu_tenure * n_courses:
+            break
+    if scorer.score < best_score:
+        restored = IncrementalScorer(scorer.model, best_genes, scorer.check)
+        restored.moves = scorer.moves
+        return restored
+    return scorer
+
+
+def repair_elites(model, individuals, method='steepest', time_limit=LOCAL_SEARCH_TIME, rng=random, check=False):
+    """Repair as many of ``individuals`` (best first) as fit in ``time_limit`` seconds.
+
+    Returns ``(individuals, scorers, stats)``: ``individuals`` with the
+    repaired entries swapped in, the :class:`IncrementalScorer` of each
+    repaired individual (None for individuals that were not reached) and
+    the hard violations of the repaired individuals before and after repair.
+    """
+    deadline = time.monotonic() + time_limit
+    individuals = list(individuals)
+    scorers = [None] * len(individuals)
+    stats = {"repaired": 0, "moves": 0, "hard_violations_before": 0, "hard_violations_after": 0}
+    for i, individual in enumerate(individuals):
+        if time.monotonic() >= deadline:
+            break
+        scorer = IncrementalScorer(model, individual, check)
+        stats["hard_violations_before"] += scorer.hard_violations()
+        scorer = repair(scorer, method, deadline, rng)
+        scorer._verify()
+        stats["repaired"] += 1
+        stats["moves"] += scorer.moves
+        stats["hard_violations_after"] += scorer.hard_violations()
+        individuals[i] = list(scorer.genes)
+        scorers[i] = scorer
+    return individuals, scorers, stats
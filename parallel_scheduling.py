@@ -0,0 +1,107 @@
+import queue
+import random
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import Manager
+
+from ga_engine import genetic_algorithm, print_progress
+from island_model import island_genetic_algorithm
+
+WORKERS = 1
+# How often the parent forwards worker progress events and checks for finished departments
+PROGRESS_POLL_SECONDS = 0.1
+
+
+def department_rng(seed, dept_code):
+    """Independent RNG for one department.
+
+    The stream depends only on ``seed`` and ``dept_code``, so results are
+    the same whichever worker runs the department and in whatever order.
+    With ``seed=None`` the RNG is seeded from the OS.
+    """
+    if seed is None:
+        return random.Random()
+    return random.Random(f"{seed}:{dept_code}")
+
+
+def _run_department(model, seed, ga_kwargs, progress=print_progress):
+    result = genetic_algorithm(model, rng=department_rng(seed, model.dept_code), progress=progress, **ga_kwargs)
+    return model.dept_code, result
+
+
+class WorkerCancelled(Exception):
+    pass
+
+
+class _QueueProgress:
+    """Progress sink for pool workers: sends events to the parent through ``events`` and aborts the
+    department at its next event (every generation) once ``cancel`` is set."""
+
+    def __init__(self, events, cancel):
+        self.events = events
+        self.cancel = cancel
+
+    def __call__(self, event):
+        if self.cancel.is_set():
+            raise WorkerCancelled()
+        # The parent re-emits each department's timings and result events, so workers leave those out
+        if event['type'] not in ('timings', 'result'):
+            self.events.put(event)
+
+
+def _drain(events, progress):
+    while True:
+        try:
+            event = events.get_nowait()
+        except queue.Empty:
+            return
+        progress(event)
+
+
+def schedule_departments(models, workers=WORKERS, seed=None, islands=1, island_options=None,
+                         progress=print_progress, **ga_kwargs):
+    """Run the GA for every compiled department model.
+
+    With ``workers`` > 1 departments are spread over a process pool; each
+    worker receives only its department's compiled model, once. With
+    ``islands`` > 1 departments run one after another instead, each one
+    split over ``islands`` processes by the island model. Returns
+    ``{dept_code: GAResult}``.
+
+    ``progress`` gets the GA's per-generation events in this process;
+    pool workers send theirs back through a queue. If ``progress`` raises
+    (e.g. the job was cancelled), running departments are stopped at
+    their next generation before the exception propagates.
+    """
+    models = list(models)
+    if islands > 1:
+        return {
+            model.dept_code: island_genetic_algorithm(
+                model, islands=islands, seed=seed, progress=progress,
+                **(island_options or {}), **ga_kwargs)
+            for model in models
+        }
+    if workers is None or workers <= 1 or len(models) <= 1:
+        return dict(_run_department(model, seed, ga_kwargs, progress) for model in models)
+
+    results = {}
+    with Manager() as manager:
+        events, cancel = manager.Queue(), manager.Event()
+        worker_progress = _QueueProgress(events, cancel)
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(models)))
+        try:
+            pending = {pool.submit(_run_department, model, seed, ga_kwargs, worker_progress) for model in models}
+            while pending:
+                done, pending = wait(pending, timeout=PROGRESS_POLL_SECONDS)
+                # A department's events are all queued before its future completes
+                _drain(events, progress)
+                for future in done:
+                    dept_code, result = future.result()
+                    results[dept_code] = result
+                    progress({"type": "timings", "dept": dept_code, **result.timings})
+                    progress(result.event(dept_code))
+        except BaseException:
+            cancel.set()
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+        pool.shutdown()
+    return {model.dept_code: results[model.dept_code] for model in models}
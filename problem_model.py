@@ -0,0 +1,224 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Tuple
+
+MIN_ROOM_CAPACITY = 30
+NO_PROFESSOR = -1
+
+
+@dataclass
+class DepartmentModel:
+    """Integer-indexed view of one department's scheduling problem.
+
+    Courses, timeslots, rooms, professors and students are mapped to dense
+    ids ``0..n-1``. The ``*_ids`` lists map a dense id back to the id used in
+    the CSV files. A timetable is a list with one ``(timeslot, room,
+    professor)`` gene per course, in course order.
+    """
+    dept_code: str
+    course_ids: list
+    timeslot_ids: list
+    room_ids: list
+    professor_ids: list
+    student_ids: list
+
+    # Flat arrays, used by the vectorized paths
+    room_capacity: np.ndarray
+    room_type: np.ndarray
+    course_room_type: np.ndarray
+    room_ok: np.ndarray
+    prof_max_load: np.ndarray
+    prof_available: np.ndarray
+    course_preferred: np.ndarray
+    enroll_course: np.ndarray
+    enroll_student: np.ndarray
+    # Course-conflict graph: course pairs (a < b) sharing students, weighted by the shared count
+    conflict_edges: np.ndarray
+    conflict_weight: np.ndarray
+    # (room, timeslot) slots already booked by other departments, shape (rooms, timeslots)
+    room_reserved: np.ndarray
+
+    # Bitsets and tuples, used by the per-gene Python loops
+    room_ok_bits: List[int] = field(default_factory=list)
+    prof_avail_bits: List[int] = field(default_factory=list)
+    preferred_bits: List[int] = field(default_factory=list)
+    max_load: List[int] = field(default_factory=list)
+    course_students: List[Tuple[int, ...]] = field(default_factory=list)
+    # Enrolled students of each course as a bitset over dense student ids
+    course_student_bits: List[int] = field(default_factory=list)
+    conflict_neighbors: List[Dict[int, int]] = field(default_factory=list)
+    # Keys ``room * n_timeslots + timeslot`` of room_reserved
+    reserved_room_slots: FrozenSet[int] = frozenset()
+    candidate_rooms: List[Tuple[int, ...]] = field(default_factory=list)
+    candidate_profs: Tuple[int, ...] = ()
+    # Feasible domains: (professor, timeslot) pairs where the professor is available
+    feasible_prof_slots: List[Tuple[Tuple[int, int], ...]] = field(default_factory=list)
+
+    @property
+    def n_courses(self):
+        return len(self.course_ids)
+
+    @property
+    def n_timeslots(self):
+        return len(self.timeslot_ids)
+
+    @property
+    def n_rooms(self):
+        return len(self.room_ids)
+
+    @property
+    def n_professors(self):
+        return len(self.professor_ids)
+
+    @property
+    def n_students(self):
+        return len(self.student_ids)
+
+
+def slot_index(timeslots_df):
+    """Timeslot positions by ``(day, start_time)``, the way timetables name their slots."""
+    return {(str(day), str(start)): i for i, (day, start)
+            in enumerate(zip(timeslots_df['day'], timeslots_df['start_time']))}
+
+
+def _bits(row):
+    value = 0
+    for i in np.flatnonzero(row).tolist():
+        value |= 1 << i
+    return value
+
+
+def _dense(values, index):
+    """Map ``values`` onto positions in ``index``; unknown values become -1."""
+    return pd.Index(index).get_indexer(values)
+
+
+def compile_department(
+    dept_code,
+    courses_df,
+    rooms_df,
+    timeslots_df,
+    professors_df,
+    prof_avail_df,
+    students_df,
+    enrollments_df,
+    course_pref_df,
+    reserved_rooms=None,
+):
+    """Build the :class:`DepartmentModel` for ``dept_code`` in one pass over the DataFrames.
+
+    ``reserved_rooms`` is an iterable of ``(room_id, timeslot_id)`` pairs
+    already booked by other departments; the GA treats using one of them
+    like double-booking the room.
+    """
+    dept_courses = courses_df[courses_df['dept_code'] == dept_code].reset_index(drop=True)
+    dept_professors = professors_df[professors_df['dept_code'] == dept_code].reset_index(drop=True)
+    dept_students = students_df[students_df['dept_code'] == dept_code]['student_id']
+    dept_enrollments = enrollments_df[enrollments_df['student_id'].isin(dept_students)]
+
+    course_ids = dept_courses['course_id'].tolist()
+    timeslot_ids = timeslots_df['timeslot_id'].tolist()
+    room_ids = rooms_df['room_id'].tolist()
+    professor_ids = dept_professors['professor_id'].tolist()
+
+    n_courses, n_timeslots = len(course_ids), len(timeslot_ids)
+    n_rooms, n_profs = len(room_ids), len(professor_ids)
+
+    # Rooms and room-type rules
+    type_names = pd.Index(pd.unique(pd.concat([
+        rooms_df['room_type'].astype(str),
+        dept_courses['required_room_type'].astype(str),
+    ])))
+    room_capacity = rooms_df['capacity'].to_numpy(dtype=np.int64)
+    room_type = type_names.get_indexer(rooms_df['room_type'].astype(str))
+    course_room_type = type_names.get_indexer(dept_courses['required_room_type'].astype(str))
+    room_ok = ((course_room_type[:, None] == room_type[None, :])
+               & (room_capacity[None, :] >= MIN_ROOM_CAPACITY))
+
+    # Professor availability and load limits
+    prof_max_load = dept_professors['max_load_per_week'].to_numpy(dtype=np.int64)
+    prof_available = np.zeros((n_profs, n_timeslots), dtype=bool)
+    avail = prof_avail_df[prof_avail_df['available'] == 1]
+    p_idx = _dense(avail['professor_id'], professor_ids)
+    t_idx = _dense(avail['timeslot_id'], timeslot_ids)
+    keep = (p_idx >= 0) & (t_idx >= 0)
+    prof_available[p_idx[keep], t_idx[keep]] = True
+
+    # Preferred timeslots
+    course_preferred = np.zeros((n_courses, n_timeslots), dtype=bool)
+    c_idx = _dense(course_pref_df['course_id'], course_ids)
+    t_idx = _dense(course_pref_df['timeslot_id'], timeslot_ids)
+    keep = (c_idx >= 0) & (t_idx >= 0)
+    course_preferred[c_idx[keep], t_idx[keep]] = True
+
+    # Enrollments of department students in department courses, deduplicated
+    enroll = dept_enrollments[dept_enrollments['course_id'].isin(course_ids)]
+    enroll = enroll[['course_id', 'student_id']].drop_duplicates()
+    student_ids = sorted(enroll['student_id'].unique().tolist())
+    enroll_course = _dense(enroll['course_id'], course_ids).astype(np.int64)
+    enroll_student = _dense(enroll['student_id'], student_ids).astype(np.int64)
+    order = np.lexsort((enroll_student, enroll_course))
+    enroll_course, enroll_student = enroll_course[order], enroll_student[order]
+    bounds = np.searchsorted(enroll_course, np.arange(n_courses + 1))
+    course_students = [tuple(enroll_student[bounds[c]:bounds[c + 1]].tolist())
+                       for c in range(n_courses)]
+
+    # Weighted course-conflict graph from a self-join of the enrollments on student
+    pairs = pd.DataFrame({'a': enroll_course, 'student': enroll_student})
+    pairs = pairs.merge(pairs.rename(columns={'a': 'b'}), on='student')
+    pairs = pairs[pairs['a'] < pairs['b']].groupby(['a', 'b']).size()
+    conflict_edges = np.array(pairs.index.tolist(), dtype=np.int64).reshape(-1, 2)
+    conflict_weight = pairs.to_numpy(dtype=np.int64)
+    conflict_neighbors = [{} for _ in range(n_courses)]
+    for (a, b), w in zip(conflict_edges.tolist(), conflict_weight.tolist()):
+        conflict_neighbors[a][b] = w
+        conflict_neighbors[b][a] = w
+
+    room_reserved = np.zeros((n_rooms, n_timeslots), dtype=bool)
+    if reserved_rooms:
+        reserved = pd.DataFrame(list(reserved_rooms), columns=['room_id', 'timeslot_id'])
+        r_idx = _dense(reserved['room_id'], room_ids)
+        t_idx = _dense(reserved['timeslot_id'], timeslot_ids)
+        keep = (r_idx >= 0) & (t_idx >= 0)
+        room_reserved[r_idx[keep], t_idx[keep]] = True
+    reserved_r, reserved_t = np.nonzero(room_reserved)
+
+    all_rooms = tuple(range(n_rooms))
+    candidate_rooms = [tuple(np.flatnonzero(row).tolist()) or all_rooms for row in room_ok]
+
+    # Every course may be taught by any department professor, so the pairs are shared
+    prof_slots = tuple(zip(*(idx.tolist() for idx in np.nonzero(prof_available))))
+    feasible_prof_slots = [prof_slots] * n_courses
+
+    return DepartmentModel(
+        dept_code=dept_code,
+        course_ids=course_ids,
+        timeslot_ids=timeslot_ids,
+        room_ids=room_ids,
+        professor_ids=professor_ids,
+        student_ids=student_ids,
+        room_capacity=room_capacity,
+        room_type=room_type,
+        course_room_type=course_room_type,
+        room_ok=room_ok,
+        prof_max_load=prof_max_load,
+        prof_available=prof_available,
+        course_preferred=course_preferred,
+        enroll_course=enroll_course,
+        enroll_student=enroll_student,
+        conflict_edges=conflict_edges,
+        conflict_weight=conflict_weight,
+        room_reserved=room_reserved,
+        room_ok_bits=[_bits(row) for row in room_ok],
+        prof_avail_bits=[_bits(row) for row in prof_available],
+        preferred_bits=[_bits(row) for row in course_preferred],
+        max_load=prof_max_load.tolist(),
+        course_students=course_students,
+        course_student_bits=[sum(1 << s for s in students) for students in course_students],
+        conflict_neighbors=conflict_neighbors,
+        reserved_room_slots=frozenset((reserved_r * n_timeslots + reserved_t).tolist()),
+        candidate_rooms=candidate_rooms,
+        candidate_profs=tuple(range(n_profs)),
+        feasible_prof_slots=feasible_prof_slots,
+    )
@@ -0,0 +1,342 @@
+import io
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+from dataset_loader import TABLES
+from ga_engine import (
+    FitnessCache,
+    GAResult,
+    StoppingCriteria,
+    create_individual,
+    fitness,
+    genetic_algorithm,
+    hard_violations,
+    mutate,
+    print_progress,
+    random_gene,
+)
+from incremental_fitness import IncrementalScorer
+from local_search import LOCAL_SEARCH_TIME, repair
+from parallel_scheduling import department_rng
+from problem_model import NO_PROFESSOR, compile_department, slot_index
+from result_cache import dataset_key
+from sqlite_database import SQLiteDatabase
+from vectorized_fitness import population_to_array
+
+# Score cost of moving a class the input changes did not affect; high enough that
+# unaffected classes only move to fix a hard-constraint violation
+CHURN_PENALTY = 8
+RESCHEDULE_POPULATION_SIZE = 40
+RESCHEDULE_MUTATION_RATE = 0.02
+# Chance that each affected class is redrawn in a perturbed copy of the current timetable
+AFFECTED_REDRAW_RATE = 0.5
+RESCHEDULE_STOPPING = StoppingCriteria(time_budget=5.0, stall_generations=15)
+# Datasets kept in memory; every dataset is also written to DATASET_DB_PATH
+MAX_STORED_DATASETS = 8
+DATASET_DB_PATH = "datasets.db"
+# Datasets kept on disk, the least recently stored dropped first
+MAX_PERSISTED_DATASETS = 32
+
+DATASET_SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    dataset_id TEXT PRIMARY KEY,
+    stored_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS datasets_by_time ON datasets (stored_at);
+CREATE TABLE IF NOT EXISTS dataset_tables (
+    dataset_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    body BLOB NOT NULL,
+    PRIMARY KEY (dataset_id, name)
+);
+"""
+
+class AvailabilityChange(BaseModel):
+    professor_id: Union[int, str]
+    timeslot_id: Union[int, str]
+    available: bool
+
+
+class Enrollment(BaseModel):
+    student_id: Union[int, str]
+    course_id: Union[int, str]
+
+
+class InputChanges(BaseModel):
+    prof_availability: List[AvailabilityChange] = []
+    enrollments_added: List[Enrollment] = []
+    enrollments_removed: List[Enrollment] = []
+
+
+class RescheduleRequest(BaseModel):
+    dataset_id: str
+    dept_code: str
+    # Current timetable in prepare_output format; defaults to the one stored via /timetable/update
+    timetable: Optional[List[Dict]] = None
+    changes: InputChanges = InputChanges()
+    churn_penalty: int = CHURN_PENALTY
+    seed: Optional[int] = None
+
+
+class DatasetStore:
+    """Scheduled input datasets, so they can be rescheduled and validated against later.
+
+    Each dataset is written as Parquet tables to an SQLite database, so
+    it outlives restarts and is seen by every worker; the most recently
+    used ones are also kept in memory.
+    """
+
+    def __init__(self, path=DATASET_DB_PATH, max_size=MAX_STORED_DATASETS, max_persisted=MAX_PERSISTED_DATASETS):
+        self.db = SQLiteDatabase(path, DATASET_SCHEMA)
+        self.max_size = max_size
+        self.max_persisted = max_persisted
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, dataset_id, frames):
+        with self._lock:
+            self._frames[dataset_id] = tuple(frames)
+            self._frames.move_to_end(dataset_id)
+            while len(self._frames) > self.max_size:
+                self._frames.popitem(last=False)
+
+    def put(self, frames):
+        """Store the eight input DataFrames and return their content-derived id."""
+        dataset_id = dataset_key(dict(zip(TABLES, frames)), {})[:16]
+        self._remember(dataset_id, frames)
+        tables = []
+        if self.db.execute("SELECT 1 FROM datasets WHERE dataset_id = ?", (dataset_id,)).fetchone() is None:
+            for name, df in zip(TABLES, frames):
+                body = io.BytesIO()
+                df.to_parquet(body, index=False)
+                tables.append((dataset_id, name, body.getvalue()))
+        with self.db.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO datasets VALUES (?, ?)", (dataset_id, time.time()))
+            conn.executemany("INSERT OR IGNORE INTO dataset_tables VALUES (?, ?, ?)", tables)
+            stale = conn.execute("SELECT dataset_id FROM datasets ORDER BY stored_at DESC LIMIT -1 OFFSET ?",
+                                 (self.max_persisted,)).fetchall()
+            for (old,) in stale:
+                conn.execute("DELETE FROM datasets WHERE dataset_id = ?", (old,))
+                conn.execute("DELETE FROM dataset_tables WHERE dataset_id = ?", (old,))
+        return dataset_id
+
+    def latest(self):
+        """Id of the most recently stored dataset."""
+        row = self.db.execute("SELECT dataset_id FROM datasets ORDER BY stored_at DESC LIMIT 1").fetchone()
+        if row is None:
+            raise HTTPException(status_code=404, detail="No dataset uploaded yet")
+        return row[0]
+
+    def get(self, dataset_id):
+        with self._lock:
+            frames = self._frames.get(dataset_id)
+            if frames is not None:
+                self._frames.move_to_end(dataset_id)
+                return frames
+        rows = dict(self.db.execute("SELECT name, body FROM dataset_tables WHERE dataset_id = ?",
+                                    (dataset_id,)).fetchall())
+        if len(rows) != len(TABLES):
+            raise HTTPException(status_code=404, detail="Dataset not found, upload it again")
+        frames = tuple(pd.read_parquet(io.BytesIO(rows[name])) for name in TABLES)
+        self._remember(dataset_id, frames)
+        return frames
+
+
+dataset_store = DatasetStore()
+
+
+def _typed(values, column):
+    """Cast request ids to the dtype of the DataFrame column they refer to."""
+    return pd.Series(values, dtype=object).astype(column.dtype)
+
+
+def apply_changes(frames, changes):
+    """Return a copy of ``frames`` with the availability and enrollment ``changes`` applied."""
+    frames = list(frames)
+    prof_avail_df, enrollments_df = frames[4], frames[6]
+
+    if changes.prof_availability:
+        availability = changes.prof_availability
+        updates = pd.DataFrame({
+            'professor_id': _typed([c.professor_id for c in availability], prof_avail_df['professor_id']),
+            'timeslot_id': _typed([c.timeslot_id for c in availability], prof_avail_df['timeslot_id']),
+            'available': [int(c.available) for c in availability],
+        }).drop_duplicates(['professor_id', 'timeslot_id'], keep='last')
+        merged = prof_avail_df.merge(updates, on=['professor_id', 'timeslot_id'], how='outer',
+                                     suffixes=('', '_new'), indicator=True)
+        merged['available'] = merged['available_new'].where(merged['_merge'] != 'left_only', merged['available'])
+        frames[4] = merged[prof_avail_df.columns].astype({'available': prof_avail_df['available'].dtype})
+
+    if changes.enrollments_added or changes.enrollments_removed:
+        def enrollment_frame(rows):
+            return pd.DataFrame({
+                'student_id': _typed([r.student_id for r in rows], enrollments_df['student_id']),
+                'course_id': _typed([r.course_id for r in rows], enrollments_df['course_id']),
+            })
+
+        removed = enrollment_frame(changes.enrollments_removed)
+        kept = enrollments_df.merge(removed, on=['student_id', 'course_id'], how='left', indicator=True)
+        kept = kept[kept['_merge'] == 'left_only'][enrollments_df.columns]
+        added = enrollment_frame(changes.enrollments_added)
+        frames[6] = pd.concat([kept, added], ignore_index=True).drop_duplicates()
+    return tuple(frames)
+
+
+def timetable_bookings(timetable, rooms_df, timeslots_df):
+    """The ``(room_id, timeslot_id)`` pairs booked by a timetable in ``prepare_output`` format."""
+    room_ids = dict(zip(rooms_df['room_name'].astype(str), rooms_df['room_id']))
+    slots = slot_index(timeslots_df)
+    timeslot_ids = timeslots_df['timeslot_id'].tolist()
+    bookings = set()
+    for entry in timetable:
+        room = room_ids.get(str(entry.get('room')))
+        slot = slots.get((str(entry.get('day')), str(entry.get('time'))))
+        if room is not None and slot is not None:
+            bookings.add((room, timeslot_ids[slot]))
+    return bookings
+
+
+def encode_timetable(model, timetable, frames, rng):
+    """Turn a ``prepare_output`` timetable back into genes for ``model``.
+
+    Returns ``(individual, missing)``, where ``missing`` lists the courses
+    the timetable did not place (or placed in an unknown room or slot);
+    those get a random gene.
+    """
+    rooms_df, timeslots_df, professors_df = frames[1], frames[2], frames[3]
+    courses = {str(cid): c for c, cid in enumerate(model.course_ids)}
+    rooms = {str(name): model.room_ids.index(rid) for name, rid in zip(rooms_df['room_name'], rooms_df['room_id'])}
+    slots = slot_index(timeslots_df)
+    dept_professors = professors_df[professors_df['dept_code'] == model.dept_code]
+    profs = {}
+    for name, pid in zip(dept_professors['name'], dept_professors['professor_id']):
+        profs.setdefault(str(name), model.professor_ids.index(pid))
+
+    individual = create_individual(model, rng)
+    placed = set()
+    for entry in timetable:
+        c = courses.get(str(entry.get('id')))
+        room = rooms.get(str(entry.get('room')))
+        ts = slots.get((str(entry.get('day')), str(entry.get('time'))))
+        if c is None or room is None or ts is None:
+            continue
+        prof = profs.get(str(entry.get('professor')), NO_PROFESSOR)
+        individual[c] = (ts, room, prof)
+        placed.add(c)
+    return individual, [c for c in range(model.n_courses) if c not in placed]
+
+
+def affected_courses(model, individual, changes, missing=()):
+    """Courses the input changes touch: new conflicts, changed enrollments or a changed professor."""
+    changed_profs = {str(change.professor_id) for change in changes.prof_availability}
+    changed_courses = {str(e.course_id) for e in changes.enrollments_added + changes.enrollments_removed}
+    scorer = IncrementalScorer(model, individual)
+    affected = set(missing)
+    for c, (ts, room, prof) in enumerate(individual):
+        if scorer.gene_conflicts(c) or str(model.course_ids[c]) in changed_courses:
+            affected.add(c)
+        elif prof != NO_PROFESSOR and str(model.professor_ids[prof]) in changed_profs:
+            affected.add(c)
+    return affected
+
+
+class ChurnPenalty:
+    """Score penalty for every unaffected class placed differently from ``reference``."""
+
+    def __init__(self, reference, affected, penalty=CHURN_PENALTY):
+        self.reference = population_to_array([reference])[0]
+        self.weights = np.full(len(reference), penalty, dtype=np.int64)
+        self.weights[list(affected)] = 0
+
+    def __call__(self, population):
+        moved = (population_to_array(population) != self.reference[None]).any(axis=2)
+        return (moved * self.weights[None]).sum(axis=1).tolist()
+
+
+def _perturb(model, current, affected, rng):
+    child = list(current)
+    for c in affected:
+        if rng.random() < AFFECTED_REDRAW_RATE:
+            child[c] = random_gene(model, c, rng)
+    return mutate(model, child, RESCHEDULE_MUTATION_RATE, rng)
+
+
+def _keep_unmoved(model, individual, reference, affected, penalty):
+    """Move unaffected classes back to where they were wherever that costs no more than ``penalty``."""
+    scorer = IncrementalScorer(model, individual)
+    for c in range(model.n_courses):
+        if c in affected or scorer.genes[c] == reference[c]:
+            continue
+        before = scorer.score
+        scorer.move(c, reference[c])
+        if scorer.score + penalty < before:
+            scorer.move(c, individual[c])
+    return list(scorer.genes)
+
+
+def reschedule(
+    dept_code,
+    frames,
+    timetable,
+    changes=None,
+    churn_penalty=CHURN_PENALTY,
+    seed=None,
+    reserved_rooms=None,
+    stopping=RESCHEDULE_STOPPING,
+    progress=print_progress,
+):
+    """Warm-start the GA from ``timetable`` after the input ``changes``.
+
+    ``frames`` are the eight input DataFrames with the changes already
+    applied (see :func:`apply_changes`). The GA starts from the current
+    timetable, a local-search repair of it and copies with the affected
+    classes redrawn, and every unaffected class placed elsewhere costs
+    ``churn_penalty``, so only the classes the new constraints require are
+    moved. Returns ``(model, result, report)``.
+    """
+    started = time.monotonic()
+    changes = changes or InputChanges()
+    rng = department_rng(seed, f"{dept_code}:reschedule")
+    model = compile_department(dept_code, *frames, reserved_rooms=reserved_rooms)
+    if not model.n_courses:
+        raise HTTPException(status_code=404, detail=f"No courses for department {dept_code}")
+
+    current, missing = encode_timetable(model, timetable, frames, rng)
+    affected = affected_courses(model, current, changes, missing)
+    penalty = ChurnPenalty(current, affected, churn_penalty)
+
+    repaired = repair(IncrementalScorer(model, current), 'steepest', time.monotonic() + 10 * LOCAL_SEARCH_TIME, rng)
+    initial = [list(current), list(repaired.genes)]
+    while len(initial) < RESCHEDULE_POPULATION_SIZE:
+        initial.append(_perturb(model, current, affected, rng))
+    result = genetic_algorithm(
+        model, population_size=RESCHEDULE_POPULATION_SIZE, mutation_rate=RESCHEDULE_MUTATION_RATE,
+        rng=rng, cache=FitnessCache(model, penalty=penalty), progress=progress, stopping=stopping,
+        initial=initial,
+    )
+
+    best = _keep_unmoved(model, result.best, current, affected, churn_penalty)
+    moved = [c for c in range(model.n_courses) if best[c] != current[c]]
+    report = {
+        "affected": len(affected),
+        "moved": len(moved),
+        "moved_unaffected": sum(1 for c in moved if c not in affected),
+        "moved_timeslot": sum(1 for c in moved if best[c][0] != current[c][0]),
+        "moved_professor": sum(1 for c in moved if best[c][2] != current[c][2]),
+        "score_before": fitness(model, current),
+        "score_after": fitness(model, best),
+        "hard_violations_before": hard_violations(model, current),
+        "hard_violations_after": hard_violations(model, best),
+        "seconds": round(time.monotonic() - started, 3),
+    }
+    result = GAResult(best=best, best_score=report["score_after"],
+                      hard_violations=report["hard_violations_after"], generations=result.generations,
+                      stop_reason=result.stop_reason, elapsed=time.monotonic() - started)
+    return model, result, report
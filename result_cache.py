@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+RESULT_CACHE_DIR = ".timetable_cache"
+RESULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# Bump when the GA or output format changes so stale timetables are not served
+CACHE_VERSION = 3
+
+
+def frame_digest(df):
+    """Hash a DataFrame's contents independently of row and column order."""
+    df = df.reindex(sorted(df.columns), axis=1)
+    rows = np.sort(pd.util.hash_pandas_object(df, index=False).to_numpy())
+    digest = hashlib.sha256()
+    digest.update(json.dumps([list(df.columns), [str(t) for t in df.dtypes]]).encode())
+    digest.update(rows.tobytes())
+    return digest.hexdigest()
+
+
+def _combine(parts, params):
+    digest = hashlib.sha256()
+    digest.update(json.dumps({"version": CACHE_VERSION, "params": params}, sort_keys=True, default=str).encode())
+    for name in sorted(parts):
+        digest.update(f"{name}={parts[name]};".encode())
+    return digest.hexdigest()
+
+
+def dataset_key(frames, params):
+    """Key for a whole upload: every input table plus the GA parameters."""
+    return _combine({name: frame_digest(df) for name, df in frames.items()}, params)
+
+
+def department_key(
+    dept_code,
+    courses_df,
+    rooms_df,
+    timeslots_df,
+    professors_df,
+    prof_avail_df,
+    students_df,
+    enrollments_df,
+    course_pref_df,
+    params,
+):
+    """Key for one department: only the rows that department's GA and output read."""
+    dept_courses = courses_df[courses_df['dept_code'] == dept_code]
+    dept_professors = professors_df[professors_df['dept_code'] == dept_code]
+    dept_students = students_df[students_df['dept_code'] == dept_code]
+    parts = {
+        "dept_code": str(dept_code),
+        "courses": frame_digest(dept_courses),
+        "rooms": frame_digest(rooms_df),
+        "timeslots": frame_digest(timeslots_df),
+        "professors": frame_digest(dept_professors),
+        "prof_availability": frame_digest(
+            prof_avail_df[prof_avail_df['professor_id'].isin(dept_professors['professor_id'])]),
+        "students": frame_digest(dept_students),
+        "enrollments": frame_digest(
+            enrollments_df[enrollments_df['student_id'].isin(dept_students['student_id'])]),
+        "course_preferred_timeslots": frame_digest(
+            course_pref_df[course_pref_df['course_id'].isin(dept_courses['course_id'])]),
+    }
+    return _combine(parts, params)
+
+
+class ResultCache:
+    """Content-addressed JSON results on local disk with size-bounded LRU eviction.
+
+    Recency is tracked through file modification times, so the cache
+    survives restarts and can be shared by several workers on one host.
+    """
+
+    def __init__(self, directory=RESULT_CACHE_DIR, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                value = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(value, f, default=str)
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.json'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
+
+    def clear(self):
+        if not os.path.isdir(self.directory):
+            return
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json'):
+                os.remove(entry.path)
+
+
+result_cache = ResultCache()
@@ -1,52 +1,166 @@
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel, Field
-from typing import List, Optional
-from datetime import date
-import uuid
-from auth_dependencies import get_current_active_user
-
-router = APIRouter()
-
-class SubstituteAssignment(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    date: date
-    original_teacher_id: str
-    substitute_teacher_id: str
-    course_id: str
-    timeslot: str
-
-substitutions_db: List[SubstituteAssignment] = []
-
-@router.post("/substitutes", response_model=SubstituteAssignment)
-def add_substitution(substitution: SubstituteAssignment, current_user: dict = Depends(get_current_active_user)):
-    if current_user["role"] not in ["admin", "teacher"]:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    substitutions_db.append(substitution)
-    return substitution
-
-@router.get("/substitutes", response_model=List[SubstituteAssignment])
-def get_substitutions(date_filter: Optional[date] = None, current_user: dict = Depends(get_current_active_user)):
-    if date_filter:
-        filtered = [sub for sub in substitutions_db if sub.date == date_filter]
-        return filtered
-    return substitutions_db
-
-@router.put("/substitutes/{sub_id}", response_model=SubstituteAssignment)
-def update_substitution(sub_id: str, substitution: SubstituteAssignment, current_user: dict = Depends(get_current_active_user)):
-    if current_user["role"] not in ["admin", "teacher"]:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    for index, sub in enumerate(substitutions_db):
-        if sub.id == sub_id:
-            substitutions_db[index] = substitution
-            return substitution
-    raise HTTPException(status_code=404, detail="Substitution not found")
-
-@router.delete("/substitutes/{sub_id}")
-def delete_substitution(sub_id: str, current_user: dict = Depends(get_current_active_user)):
-    if current_user["role"] != "admin":
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    for index, sub in enumerate(substitutions_db):
-        if sub.id == sub_id:
-            substitutions_db.pop(index)
-            return {"detail": "Substitution deleted"}
-    raise HTTPException(status_code=404, detail="Substitution not found")
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import date
+import sqlite3
+import uuid
+from auth_dependencies import get_current_active_user
+from sqlite_database import SQLiteDatabase
+
+router = APIRouter()
+
+SUBSTITUTION_DB_PATH = "substitutions.db"
+MAX_PAGE_SIZE = 1000
+
+class SubstituteAssignment(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    date: date
+    original_teacher_id: str
+    substitute_teacher_id: str
+    course_id: str
+    timeslot: str
+
+COLUMNS = ('id', 'date', 'original_teacher_id', 'substitute_teacher_id', 'course_id', 'timeslot')
+
+# Each lookup column is indexed together with the date, so filters, date ranges and the
+# date-ordered listing are all served from one index
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS substitutions (
+    id TEXT PRIMARY KEY,
+    date TEXT NOT NULL,
+    original_teacher_id TEXT NOT NULL,
+    substitute_teacher_id TEXT NOT NULL,
+    course_id TEXT NOT NULL,
+    timeslot TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS substitutions_by_date ON substitutions (date, id);
+CREATE INDEX IF NOT EXISTS substitutions_by_original ON substitutions (original_teacher_id, date);
+CREATE INDEX IF NOT EXISTS substitutions_by_substitute ON substitutions (substitute_teacher_id, date);
+CREATE INDEX IF NOT EXISTS substitutions_by_course ON substitutions (course_id, date);
+"""
+
+
+class SubstitutionStore:
+    """Substitutions in an embedded SQLite database (see :class:`SQLiteDatabase`).
+
+    Rows are indexed by id, and by date, original teacher, substitute
+    teacher and course (each together with the date).
+    """
+
+    def __init__(self, path=SUBSTITUTION_DB_PATH):
+        self.db = SQLiteDatabase(path, SCHEMA)
+
+    @staticmethod
+    def _row(substitution):
+        return (substitution.id, substitution.date.isoformat(), substitution.original_teacher_id,
+                substitution.substitute_teacher_id, substitution.course_id, substitution.timeslot)
+
+    def add_many(self, substitutions):
+        """Insert substitutions in one transaction; nothing is stored if any id already exists."""
+        try:
+            with self.db.transaction() as conn:
+                conn.executemany(f"INSERT INTO substitutions ({', '.join(COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)",
+                                 [self._row(sub) for sub in substitutions])
+        except sqlite3.IntegrityError:
+            raise HTTPException(status_code=409, detail="Substitution id already exists")
+
+    def get(self, sub_id):
+        row = self.db.execute("SELECT * FROM substitutions WHERE id = ?", (sub_id,)).fetchone()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Substitution not found")
+        return SubstituteAssignment(**row)
+
+    def query(self, start_date=None, end_date=None, original_teacher_id=None, substitute_teacher_id=None,
+              course_id=None, limit=None, offset=0):
+        """Substitutions matching every given filter, ordered by date, and the total number of matches.
+
+        ``start_date`` and ``end_date`` are inclusive.
+        """
+        clauses, params = [], []
+        for column, value in (('original_teacher_id', original_teacher_id),
+                              ('substitute_teacher_id', substitute_teacher_id), ('course_id', course_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if start_date is not None:
+            clauses.append("date >= ?")
+            params.append(start_date.isoformat())
+        if end_date is not None:
+            clauses.append("date <= ?")
+            params.append(end_date.isoformat())
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        conn = self.db.connection()
+        total = conn.execute(f"SELECT COUNT(*) FROM substitutions{where}", params).fetchone()[0]
+        rows = conn.execute(f"SELECT * FROM substitutions{where} ORDER BY date, id LIMIT ? OFFSET ?",
+                            params + [-1 if limit is None else limit, offset]).fetchall()
+        return [SubstituteAssignment(**row) for row in rows], total
+
+    def update(self, sub_id, substitution):
+        """Replace a substitution, keeping its id."""
+        substitution = substitution.model_copy(update={"id": sub_id})
+        cursor = self.db.execute(
+            f"UPDATE substitutions SET {', '.join(f'{column} = ?' for column in COLUMNS[1:])} WHERE id = ?",
+            self._row(substitution)[1:] + (sub_id,))
+        if cursor.rowcount == 0:
+            raise HTTPException(status_code=404, detail="Substitution not found")
+        return substitution
+
+    def delete(self, sub_id):
+        cursor = self.db.execute("DELETE FROM substitutions WHERE id = ?", (sub_id,))
+        if cursor.rowcount == 0:
+            raise HTTPException(status_code=404, detail="Substitution not found")
+
+
+substitution_store = SubstitutionStore()
+
+@router.post("/substitutes", response_model=SubstituteAssignment)
+def add_substitution(substitution: SubstituteAssignment, current_user: dict = Depends(get_current_active_user)):
+    if current_user["role"] not in ["admin", "teacher"]:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    substitution_store.add_many([substitution])
+    return substitution
+
+@router.post("/substitutes/bulk")
+def add_substitutions(substitutions: List[SubstituteAssignment], current_user: dict = Depends(get_current_active_user)):
+    if current_user["role"] not in ["admin", "teacher"]:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    substitution_store.add_many(substitutions)
+    return {"inserted": len(substitutions)}
+
+@router.get("/substitutes", response_model=List[SubstituteAssignment])
+def get_substitutions(
+    response: Response,
+    date_filter: Optional[date] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    original_teacher_id: Optional[str] = None,
+    substitute_teacher_id: Optional[str] = None,
+    course_id: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    current_user: dict = Depends(get_current_active_user),
+):
+    # date_filter is a single day; start_date/end_date an inclusive range. Without a limit every match is returned
+    if date_filter:
+        start_date = end_date = date_filter
+    substitutions, total = substitution_store.query(start_date, end_date, original_teacher_id,
+                                                    substitute_teacher_id, course_id, limit, offset)
+    response.headers["X-Total-Count"] = str(total)
+    return substitutions
+
+@router.get("/substitutes/{sub_id}", response_model=SubstituteAssignment)
+def get_substitution(sub_id: str, current_user: dict = Depends(get_current_active_user)):
+    return substitution_store.get(sub_id)
+
+@router.put("/substitutes/{sub_id}", response_model=SubstituteAssignment)
+def update_substitution(sub_id: str, substitution: SubstituteAssignment, current_user: dict = Depends(get_current_active_user)):
+    if current_user["role"] not in ["admin", "teacher"]:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return substitution_store.update(sub_id, substitution)
+
+@router.delete("/substitutes/{sub_id}")
+def delete_substitution(sub_id: str, current_user: dict = Depends(get_current_active_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    substitution_store.delete(sub_id)
+    return {"detail": "Substitution deleted"}
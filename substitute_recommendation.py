@@ -0,0 +1,251 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import date, timedelta
+from typing import List, Optional
+
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+
+from auth_dependencies import get_current_active_user
+from problem_model import slot_index
+from rescheduling import dataset_store
+from substitute_management import substitution_store
+from timetable_management import timetable_store
+
+router = APIRouter()
+
+RECOMMENDATIONS = 10
+MAX_RECOMMENDATIONS = 50
+MAX_BATCH_SIZE = 200
+# Datasets whose professor/availability indexes are kept built
+MAX_INDEXED_DATASETS = 4
+
+
+class SubstituteRequest(BaseModel):
+    original_teacher_id: str
+    date: date
+    timeslot: str
+    course_id: Optional[str] = None
+
+
+class RecommendationRequest(BaseModel):
+    requests: List[SubstituteRequest]
+    # Defaults to the most recently uploaded dataset
+    dataset_id: Optional[str] = None
+    # Candidates returned per request
+    limit: int = Field(RECOMMENDATIONS, ge=1, le=MAX_RECOMMENDATIONS)
+
+
+class SubstituteIndex:
+    """Professor availability, teaching occupancy and load of one dataset as arrays over professors.
+
+    Availability comes from ``prof_availability``; occupancy and weekly
+    load from the stored timetables, re-derived only when one of them is
+    replaced.
+    """
+
+    def __init__(self, frames):
+        courses_df, _, timeslots_df, professors_df, prof_avail_df = frames[:5]
+        professors_df = professors_df.drop_duplicates('professor_id')
+        self.professor_ids = professors_df['professor_id'].astype(str).tolist()
+        self.names = professors_df['name'].astype(str).tolist()
+        self.depts = professors_df['dept_code'].astype(str).to_numpy(dtype=object)
+        self.max_load = professors_df['max_load_per_week'].to_numpy(dtype=np.int64)
+        self.professor_index = {pid: p for p, pid in enumerate(self.professor_ids)}
+        for p, name in enumerate(self.names):
+            self.professor_index.setdefault(name, p)
+        self.course_depts = dict(zip(courses_df['course_id'].astype(str), courses_df['dept_code'].astype(str)))
+
+        # Timeslots can be named by id or as "<day> <start_time>"
+        self.slot_index = slot_index(timeslots_df)
+        self.timeslots = {str(tid): t for t, tid in enumerate(timeslots_df['timeslot_id'])}
+        self.timeslots.update({f"{day} {start}": t for (day, start), t in self.slot_index.items()})
+        n_timeslots = len(timeslots_df)
+
+        # Availability bitmap: professors x timeslots
+        self.available = np.zeros((len(self.professor_ids), n_timeslots), dtype=bool)
+        rows = prof_avail_df[prof_avail_df['available'] == 1]
+        profs = rows['professor_id'].astype(str).map(self.professor_index)
+        slots = rows['timeslot_id'].astype(str).map(self.timeslots)
+        known = profs.notna() & slots.notna()
+        self.available[profs[known].astype(int).to_numpy(), slots[known].astype(int).to_numpy()] = True
+
+        self._lock = threading.Lock()
+        self._occupancy_source = None
+        self._occupancy = None
+
+    def occupancy(self):
+        """``(teaching, load)``: which professor teaches in which timeslot, and classes per week."""
+        with self._lock:
+            timetables = list(timetable_store.items())
+            source = self._occupancy_source
+            if source is not None and len(source) == len(timetables) and all(
+                    dept == old_dept and timetable is old for (dept, timetable), (old_dept, old)
+                    in zip(timetables, source)):
+                return self._occupancy
+            teaching = np.zeros_like(self.available)
+            load = np.zeros(len(self.professor_ids), dtype=np.int64)
+            for dept, timetable in timetables:
+                for entry in timetable:
+                    p = self.professor_index.get(str(entry.get('professor')))
+                    slot = self.slot_index.get((str(entry.get('day')), str(entry.get('time'))))
+                    if p is not None and slot is not None:
+                        teaching[p, slot] = True
+                        load[p] += 1
+            # Holding the timetables themselves makes the identity check above safe
+            self._occupancy_source = timetables
+            self._occupancy = (teaching, load)
+            return self._occupancy
+
+    def timeslot(self, name):
+        slot = self.timeslots.get(str(name).strip())
+        if slot is None:
+            raise HTTPException(status_code=400, detail=f"Unknown timeslot: {name}")
+        return slot
+
+    def professor(self, teacher_id):
+        p = self.professor_index.get(str(teacher_id))
+        if p is None:
+            raise HTTPException(status_code=404, detail=f"Unknown teacher: {teacher_id}")
+        return p
+
+
+class _Week:
+    """Substitutions already booked in one Monday-to-Sunday week, as per-professor arrays."""
+
+    def __init__(self, index, monday):
+        n_profs = len(index.professor_ids)
+        self.covered = np.zeros(n_profs, dtype=np.int64)
+        # (date, timeslot) -> professors already substituting then
+        self.busy = {}
+        # date -> professors being substituted (e.g. off sick) that day
+        self.absent = {}
+        substitutions, _ = substitution_store.query(start_date=monday, end_date=monday + timedelta(days=6))
+        for sub in substitutions:
+            substitute = index.professor_index.get(sub.substitute_teacher_id)
+            original = index.professor_index.get(sub.original_teacher_id)
+            if original is not None:
+                self.absent.setdefault(sub.date, set()).add(original)
+            if substitute is not None:
+                self.book(sub.date, index.timeslots.get(sub.timeslot.strip()), substitute)
+
+    def book(self, day, slot, professor):
+        self.covered[professor] += 1
+        if slot is not None:
+            self.busy.setdefault((day, slot), set()).add(professor)
+
+
+def _mask(size, members):
+    mask = np.zeros(size, dtype=bool)
+    mask[list(members)] = True
+    return mask
+
+
+def recommend(index, request, week, limit=RECOMMENDATIONS):
+    """Rank the professors who could cover ``request``.
+
+    A candidate must be available in the timeslot, not teach or already
+    substitute in it, have weekly load to spare and not be off that day
+    (anyone being substituted on a date counts as off for the whole day).
+    Professors of the course's department come first, then those with the
+    most load left and the fewest substitutions that week.
+    """
+    slot = index.timeslot(request.timeslot)
+    original = index.professor(request.original_teacher_id)
+    teaching, load = index.occupancy()
+    remaining = index.max_load - load - week.covered
+
+    excluded = Counter()
+    n_profs = len(index.professor_ids)
+    candidates = np.ones(n_profs, dtype=bool)
+    candidates[original] = False
+    checks = (
+        ('unavailable', ~index.available[:, slot]),
+        ('teaching', teaching[:, slot]),
+        ('substituting', _mask(n_profs, week.busy.get((request.date, slot), ()))),
+        ('absent', _mask(n_profs, week.absent.get(request.date, ()))),
+        ('max_load', remaining <= 0),
+    )
+    for reason, failed in checks:
+        excluded[reason] = int((candidates & failed).sum())
+        candidates &= ~failed
+
+    dept = index.course_depts.get(str(request.course_id)) if request.course_id is not None else None
+    if dept is None:
+        dept = index.depts[original]
+    same_dept = index.depts == dept
+    picks = np.flatnonzero(candidates)
+    order = np.lexsort((week.covered[picks], -remaining[picks], ~same_dept[picks]))
+    ranked = [
+        {
+            "professor_id": index.professor_ids[p],
+            "name": index.names[p],
+            "dept_code": index.depts[p],
+            "same_department": bool(same_dept[p]),
+            "remaining_load": int(remaining[p]),
+            "substitutions_this_week": int(week.covered[p]),
+        }
+        for p in picks[order[:limit]]
+    ]
+    return {**request.model_dump(mode='json'), "candidates": ranked, "excluded": dict(excluded)}
+
+
+class IndexCache:
+    """Built :class:`SubstituteIndex` per dataset id, least recently used evicted first."""
+
+    def __init__(self, max_size=MAX_INDEXED_DATASETS):
+        self.max_size = max_size
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, dataset_id=None):
+        dataset_id = dataset_id or dataset_store.latest()
+        with self._lock:
+            index = self._indexes.get(dataset_id)
+            if index is not None:
+                self._indexes.move_to_end(dataset_id)
+                return dataset_id, index
+        index = SubstituteIndex(dataset_store.get(dataset_id))
+        with self._lock:
+            self._indexes[dataset_id] = index
+            while len(self._indexes) > self.max_size:
+                self._indexes.popitem(last=False)
+        return dataset_id, index
+
+
+index_cache = IndexCache()
+
+
+def recommend_batch(request):
+    """Answer every request in turn; each top pick counts as booked for the requests after it,
+    so a batch never proposes the same professor twice for one timeslot."""
+    started = time.perf_counter()
+    dataset_id, index = index_cache.get(request.dataset_id)
+    weeks = {}
+    for item in request.requests:
+        monday = item.date - timedelta(days=item.date.weekday())
+        if monday not in weeks:
+            weeks[monday] = _Week(index, monday)
+        # Teachers being covered in this batch are off too
+        weeks[monday].absent.setdefault(item.date, set()).add(index.professor(item.original_teacher_id))
+    answers = []
+    for item in request.requests:
+        monday = item.date - timedelta(days=item.date.weekday())
+        answer = recommend(index, item, weeks[monday], request.limit)
+        if answer["candidates"]:
+            top = index.professor(answer["candidates"][0]["professor_id"])
+            weeks[monday].book(item.date, index.timeslot(item.timeslot), top)
+        answers.append(answer)
+    return {"dataset_id": dataset_id, "recommendations": answers,
+            "seconds": round(time.perf_counter() - started, 4)}
+
+
+@router.post("/substitutes/recommendations")
+def get_recommendations(request: RecommendationRequest, current_user: dict = Depends(get_current_active_user)):
+    if current_user["role"] not in ["admin", "teacher"]:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    if len(request.requests) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} requests per batch")
+    return recommend_batch(request)
@@ -0,0 +1,194 @@
+import json
+import logging
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+router = APIRouter()
+
+# GA phases timed per generation and per run, in reporting order
+PHASES = ('init', 'selection', 'crossover', 'mutation', 'fitness', 'local_search', 'output')
+PROFILE_INTERVAL = 0.005
+# Functions listed in a profile report
+PROFILE_TOP = 25
+PROGRESS_LOGGER = 'timetable.ga'
+# Fields of a department's result that a later 'repair' event replaces
+REPAIRED_RESULT = ('best_score', 'hard_violations', 'elapsed')
+
+
+class PhaseTimer:
+    """Accumulates seconds per GA phase, both for the whole run and since the last :meth:`lap`."""
+
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self._lap = defaultdict(float)
+
+    def add(self, phase, seconds):
+        self.totals[phase] += seconds
+        self._lap[phase] += seconds
+
+    def lap(self):
+        """Seconds per phase since the previous lap, then start a new one."""
+        lap = {phase: round(seconds, 6) for phase, seconds in self._lap.items()}
+        self._lap.clear()
+        return lap
+
+    def summary(self):
+        return {phase: round(seconds, 6) for phase, seconds in self.totals.items()}
+
+
+def fan_out(*sinks):
+    """A progress sink that passes every event to each of ``sinks`` in turn."""
+    def progress(event):
+        for sink in sinks:
+            sink(event)
+    return progress
+
+
+def logging_progress(event, logger=logging.getLogger(PROGRESS_LOGGER)):
+    """Progress sink that logs every event as one JSON line, for log shippers instead of stdout."""
+    logger.info(json.dumps(event, default=str))
+
+
+class MetricsRegistry:
+    """Process-wide GA counters and the latest per-department run statistics, fed from progress events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.counters = Counter()
+            self.phase_seconds = Counter()
+            self.stop_reasons = Counter()
+            self.departments = {}
+
+    def record(self, event):
+        kind, dept = event.get('type'), str(event.get('dept'))
+        with self._lock:
+            if kind == 'generation':
+                self.counters['generations'] += 1
+                stats = {key: event[key] for key in ('generation', 'best_score', 'mean_score', 'score_std',
+                                                    'hard_violations') if key in event}
+                self.departments.setdefault(dept, {}).update(stats)
+            elif kind == 'evaluations':
+                self.counters['evaluations'] += event.get('evaluations', 0)
+                self.counters['evaluations_avoided'] += event.get('avoided', 0)
+            elif kind == 'timings':
+                for phase in PHASES:
+                    self.phase_seconds[phase] += event.get(phase, 0.0)
+            elif kind == 'result':
+                self.counters['runs'] += 1
+                self.stop_reasons[event.get('stop_reason', 'unknown')] += 1
+                self.departments.setdefault(dept, {})['result'] = {
+                    key: value for key, value in event.items() if key not in ('type', 'dept')}
+            elif kind == 'repair':
+                result = self.departments.setdefault(dept, {}).setdefault('result', {})
+                result.update({key: event[key] for key in REPAIRED_RESULT})
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "uptime_seconds": round(time.time() - self.started_at, 3),
+                "counters": dict(self.counters),
+                "phase_seconds": {phase: round(self.phase_seconds[phase], 6) for phase in PHASES},
+                "stop_reasons": dict(self.stop_reasons),
+                "departments": {dept: dict(stats) for dept, stats in self.departments.items()},
+            }
+
+    def prometheus(self):
+        """The counters in Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in sorted(snapshot["counters"].items()):
+            lines += [f"# TYPE timetable_ga_{name}_total counter", f"timetable_ga_{name}_total {value}"]
+        lines.append("# TYPE timetable_ga_phase_seconds_total counter")
+        lines += [f'timetable_ga_phase_seconds_total{{phase="{phase}"}} {seconds}'
+                  for phase, seconds in snapshot["phase_seconds"].items()]
+        lines.append("# TYPE timetable_ga_stop_reason_total counter")
+        lines += [f'timetable_ga_stop_reason_total{{reason="{reason}"}} {count}'
+                  for reason, count in sorted(snapshot["stop_reasons"].items())]
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+class SamplingProfiler:
+    """Statistical profiler for one thread: samples its Python stack every ``interval`` seconds.
+
+    Use as a context manager around the code to profile; by default it
+    samples the thread that enters it. Sampling runs on a background thread
+    through ``sys._current_frames``, so the profiled code is not
+    instrumented and runs at close to full speed. Work in other processes
+    (worker pools, islands) is not seen.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.samples = 0
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+        self.seconds = 0.0
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def __enter__(self):
+        if self.thread_id is None:
+            self.thread_id = threading.get_ident()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample, daemon=True, name='sampling-profiler')
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.seconds = time.perf_counter() - self._started
+        return False
+
+    def report(self, top=PROFILE_TOP):
+        """Sample counts per function (``self``: on top of the stack, ``total``: anywhere on it)
+        and the collapsed stacks, ready for flame-graph tools."""
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for function in set(stack):
+                total[function] += count
+        samples = max(self.samples, 1)
+        return {
+            "samples": self.samples,
+            "interval": self.interval,
+            "seconds": round(self.seconds, 3),
+            "functions": [{"function": function, "self": count, "total": total[function],
+                           "self_share": round(count / samples, 4)}
+                          for function, count in own.most_common(top)],
+            "stacks": {";".join(stack): count for stack, count in self.stacks.most_common()},
+        }
+
+
+@router.get("/metrics")
+def get_metrics(format: str = 'json'):
+    if format == 'prometheus':
+        return PlainTextResponse(metrics.prometheus())
+    return metrics.snapshot()
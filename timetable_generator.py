@@ -1,194 +1,116 @@
-import pandas as pd
-import random
-from collections import defaultdict
-
-# Load all base datasets
-courses_df = pd.read_csv('courses.csv')
-rooms_df = pd.read_csv('rooms.csv')
-timeslots_df = pd.read_csv('timeslots.csv')
-professors_df = pd.read_csv('professors.csv')
-prof_avail_df = pd.read_csv('prof_availability.csv')
-students_df = pd.read_csv('students.csv')
-enrollments_df = pd.read_csv('enrollments.csv')
-course_pref_df = pd.read_csv('course_preferred_timeslots.csv')
-
-POPULATION_SIZE = 100
-GENERATIONS = 50
-MUTATION_RATE = 0.15
-
-def ga_scheduler_for_department(dept_code):
-    # Filter data for the department
-    dept_courses = courses_df[courses_df['dept_code'] == dept_code].reset_index(drop=True)
-    dept_professors = professors_df[professors_df['dept_code'] == dept_code].reset_index(drop=True)
-    dept_students = students_df[students_df['dept_code'] == dept_code]['student_id'].tolist()
-    dept_enrollments = enrollments_df[enrollments_df['student_id'].isin(dept_students)]
-
-    # Mappings
-    course_dept = dept_courses.set_index('course_id')['dept_code'].to_dict()
-    professors_by_dept = dept_professors['professor_id'].tolist()
-    prof_avail_map = prof_avail_df[prof_avail_df['available'] == 1]
-    prof_avail_map = prof_avail_map[prof_avail_map['professor_id'].isin(professors_by_dept)]
-    prof_avail_map = prof_avail_map.groupby('professor_id')['timeslot_id'].apply(set).to_dict()
-
-    # Map courses -> professors for this dept
-    course_profs = {cid: professors_by_dept for cid in dept_courses['course_id']}
-
-    room_cap = rooms_df.set_index('room_id')['capacity'].to_dict()
-    room_type = rooms_df.set_index('room_id')['room_type'].to_dict()
-    course_roomreq = dept_courses.set_index('course_id')['required_room_type'].to_dict()
-
-    # Students enrolled in each course (dept-level filtered)
-    course_students = dept_enrollments.groupby('course_id')['student_id'].apply(set).to_dict()
-
-    student_course_map = dept_enrollments.groupby('student_id')['course_id'].apply(set).to_dict()
-
-    # Preferred timeslots for dept courses
-    course_pref_map = course_pref_df[course_pref_df['course_id'].isin(dept_courses['course_id'])]
-    course_pref_map = course_pref_map.groupby('course_id')['timeslot_id'].apply(set).to_dict()
-
-    def create_individual():
-        individual = []
-        for _, course in dept_courses.iterrows():
-            cid = course['course_id']
-            timeslot = random.choice(timeslots_df['timeslot_id'])
-            possible_rooms = [r for r in rooms_df['room_id']
-                              if room_type[r] == course_roomreq.get(cid, 'Lecture') and room_cap[r] >= 30]
-
-            if not possible_rooms:
-                possible_rooms = rooms_df['room_id'].tolist()
-
-            room = random.choice(possible_rooms)
-            prof_list = course_profs.get(cid, [])
-            prof = random.choice(prof_list) if prof_list else None
-
-            individual.append((cid, timeslot, room, prof))
-        return individual
-
-    def fitness(individual):
-        score = 0
-        used_room_time = set()
-        prof_time = defaultdict(set)
-        prof_load = defaultdict(int)
-        student_time_courses = defaultdict(set)
-
-        for gene in individual:
-            cid, ts, room, prof = gene
-
-            if room_cap[room] < 30 or room_type[room] != course_roomreq.get(cid, 'Lecture'):
-                score -= 5
-            else:
-                score += 1
-
-            if (room, ts) in used_room_time:
-                score -= 10
-            else:
-                used_room_time.add((room, ts))
-                score += 2
-
-            if prof is not None:
-                if ts not in prof_avail_map.get(prof, set()):
-                    score -= 10
-                if ts in prof_time[prof]:
-                    score -= 15
-                prof_time[prof].add(ts)
-                prof_load[prof] += 1
-                score += 2
-            else:
-                score -= 5
-
-            students = course_students.get(cid, set())
-            for stu in students:
-                if ts in student_time_courses[stu]:
-                    score -= 15
-                else:
-                    student_time_courses[stu].add(ts)
-
-            if ts in course_pref_map.get(cid, set()):
-                score += 3
-
-        for prof, load in prof_load.items():
-            max_load = dept_professors.loc[dept_professors['professor_id'] == prof, 'max_load_per_week'].values[0]
-            if load > max_load:
-                score -= (load - max_load) * 10
-
-        return score
-
-    def selection(population):
-        population.sort(key=fitness, reverse=True)
-        return population[:int(0.2 * len(population))]
-
-    def crossover(p1, p2):
-        point = random.randint(1, len(p1) - 1)
-        return p1[:point] + p2[point:]
-
-    def mutate(individual):
-        for i in range(len(individual)):
-            if random.random() < MUTATION_RATE:
-                cid, _, _, _ = individual[i]
-                timeslot = random.choice(timeslots_df['timeslot_id'])
-
-                possible_rooms = [r for r in rooms_df['room_id']
-                                  if room_type[r] == course_roomreq.get(cid, 'Lecture') and room_cap[r] >= 30]
-                if not possible_rooms:
-                    possible_rooms = rooms_df['room_id'].tolist()
-                room = random.choice(possible_rooms)
-
-                prof_list = course_profs.get(cid, [])
-                prof = random.choice(prof_list) if prof_list else None
-                individual[i] = (cid, timeslot, room, prof)
-        return individual
-
-    def genetic_algorithm():
-        population = [create_individual() for _ in range(POPULATION_SIZE)]
-        best = None
-        best_score = float('-inf')
-        for gen in range(GENERATIONS):
-            selected = selection(population)
-            next_pop = selected[:]
-            while len(next_pop) < POPULATION_SIZE:
-                p1, p2 = random.sample(selected, 2)
-                child = crossover(p1, p2)
-                child = mutate(child)
-                next_pop.append(child)
-            population = next_pop
-            current_best = max(population, key=fitness)
-            current_score = fitness(current_best)
-            print(f"[{dept_code}] Gen {gen + 1}, Best Score: {current_score}")
-            if current_score > best_score:
-                best = current_best
-                best_score = current_score
-        return best
-
-    def print_and_save_timetable(best_schedule):
-        timetable = {day: {period: [] for period in range(6)} for day in timeslots_df['day'].unique()}
-        for gene in best_schedule:
-            cid, ts, room, prof = gene
-            course_name = dept_courses.loc[dept_courses['course_id'] == cid, 'course_name'].values[0]
-            room_name = rooms_df.loc[rooms_df['room_id'] == room, 'room_name'].values[0]
-            prof_name = (dept_professors.loc[dept_professors['professor_id'] == prof, 'name'].values[0]
-                         if prof is not None else "NA")
-            day = timeslots_df.loc[timeslots_df['timeslot_id'] == ts, 'day'].values[0]
-            start_time = timeslots_df.loc[timeslots_df['timeslot_id'] == ts, 'start_time'].values[0]
-            period = int(start_time.split(":")[0]) - 9
-
-            timetable[day][period].append(f"{course_name} ({room_name}, {prof_name})")
-
-        df_dict = {}
-        for day, periods in timetable.items():
-            df_dict[day] = [", ".join(periods[p]) if periods[p] else "" for p in range(6)]
-
-        timetable_df = pd.DataFrame(df_dict, index=[f"Period {i+1}" for i in range(6)])
-        print(f"\nTimetable for {dept_code}:")
-        print(timetable_df)
-        timetable_df.to_csv(f"optimized_timetable_{dept_code}.csv")
-        print(f"Saved to optimized_timetable_{dept_code}.csv")
-
-    best_schedule = genetic_algorithm()
-    print_and_save_timetable(best_schedule)
-
-def main():
-    for dept in sorted(courses_df['dept_code'].unique()):
-        ga_scheduler_for_department(dept)
-
-if __name__ == "__main__":
-    main()
+import argparse
+import logging
+from contextlib import nullcontext
+from dataset_loader import load_directory
+from dataset_validation import validate_dataset
+from ga_engine import (
+    GENERATIONS,
+    UNCONSTRAINED_SHARE,
+    StoppingCriteria,
+    decode_individual,
+    print_progress,
+)
+from parallel_scheduling import WORKERS
+from institution_scheduling import ROOM_SHARING, ROOM_SHARING_MODES, schedule_institution
+from constructive_seeding import SEEDED_FRACTION
+from local_search import LOCAL_SEARCH_METHODS, LOCAL_SEARCH_TIME
+from island_model import MIGRATION_INTERVAL, MIGRATION_SIZE, TOPOLOGIES
+from telemetry import SamplingProfiler, logging_progress
+from timetable_output import TimetableFormatter
+
+# Load all base datasets (CSV or Parquet) with their declared column types
+(courses_df, rooms_df, timeslots_df, professors_df, prof_avail_df,
+ students_df, enrollments_df, course_pref_df), _ = load_directory('.')
+formatter = TimetableFormatter(courses_df, rooms_df, timeslots_df, professors_df)
+
+def check_dataset():
+    # Fail fast on broken inputs instead of part way through the GA
+    validation = validate_dataset((courses_df, rooms_df, timeslots_df, professors_df, prof_avail_df,
+                                   students_df, enrollments_df, course_pref_df))
+    for level in ('errors', 'warnings'):
+        for issue in validation[level]:
+            print(f"{level[:-1].capitalize()}: {issue['message']} ({issue.get('count', 1)} rows, "
+                  f"e.g. {issue.get('examples', [])[:2]})")
+    if not validation["valid"]:
+        raise SystemExit("Dataset failed validation")
+
+def print_and_save_timetable(dept_code, best_schedule):
+    timetable_df = formatter.grid(best_schedule)
+    print(f"\nTimetable for {dept_code}:")
+    print(timetable_df)
+    timetable_df.to_csv(f"optimized_timetable_{dept_code}.csv")
+    print(f"Saved to optimized_timetable_{dept_code}.csv")
+
+def main(workers=WORKERS, seed=None, islands=1, island_options=None, generations=GENERATIONS, stopping=None,
+         unconstrained_share=UNCONSTRAINED_SHARE, local_search=None, local_search_time=LOCAL_SEARCH_TIME,
+         seeded_fraction=SEEDED_FRACTION, room_sharing=ROOM_SHARING, progress=print_progress):
+    frames = (courses_df, rooms_df, timeslots_df, professors_df,
+              prof_avail_df, students_df, enrollments_df, course_pref_df)
+    models, results, _ = schedule_institution(frames, mode=room_sharing, workers=workers, seed=seed,
+                                              islands=islands, island_options=island_options,
+                                              generations=generations, stopping=stopping,
+                                              unconstrained_share=unconstrained_share,
+                                              local_search=local_search, local_search_time=local_search_time,
+                                              seeded_fraction=seeded_fraction, progress=progress)
+    for dept in sorted(models):
+        print_and_save_timetable(dept, decode_individual(models[dept], results[dept].best))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate optimized timetables for every department.")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help="number of worker processes; departments run in parallel when > 1")
+    parser.add_argument("--seed", default=None, help="base seed for reproducible runs")
+    parser.add_argument("--islands", type=int, default=1,
+                        help="evolve each department as this many migrating sub-populations")
+    parser.add_argument("--migration-interval", type=int, default=MIGRATION_INTERVAL,
+                        help="generations between migrations in island mode")
+    parser.add_argument("--migration-size", type=int, default=MIGRATION_SIZE,
+                        help="timetables sent by each island per migration")
+    parser.add_argument("--topology", choices=TOPOLOGIES, default='ring',
+                        help="migration topology in island mode")
+    parser.add_argument("--generations", type=int, default=GENERATIONS,
+                        help="hard cap on generations per department")
+    parser.add_argument("--time-budget", type=float, default=None,
+                        help="wall-clock seconds per department")
+    parser.add_argument("--stall-generations", type=int, default=None,
+                        help="stop after this many generations without improvement")
+    parser.add_argument("--target-score", type=int, default=None,
+                        help="stop once the best score reaches this value")
+    parser.add_argument("--until-feasible", action="store_true",
+                        help="stop once the best timetable has no hard-constraint violations")
+    parser.add_argument("--unconstrained-share", type=float, default=UNCONSTRAINED_SHARE,
+                        help="share of genes drawn outside the feasible professor/timeslot domain")
+    parser.add_argument("--local-search", choices=LOCAL_SEARCH_METHODS, default=None,
+                        help="repair each generation's elites with this local search")
+    parser.add_argument("--local-search-time", type=float, default=LOCAL_SEARCH_TIME,
+                        help="seconds of local search per generation")
+    parser.add_argument("--seeded-fraction", type=float, default=SEEDED_FRACTION,
+                        help="share of the initial population built by DSatur graph colouring")
+    parser.add_argument("--room-sharing", choices=ROOM_SHARING_MODES, default=ROOM_SHARING,
+                        help="how departments share rooms: independently, in sequence, or in parallel then repaired")
+    parser.add_argument("--log-json", action="store_true",
+                        help="log progress events as JSON lines instead of printing them")
+    parser.add_argument("--profile", action="store_true",
+                        help="sample the scheduler's stack and print the hottest functions")
+    args = parser.parse_args()
+    check_dataset()
+    progress = print_progress
+    if args.log_json:
+        logging.basicConfig(level=logging.INFO, format='%(message)s')
+        progress = logging_progress
+    profiler = SamplingProfiler() if args.profile else nullcontext()
+    with profiler:
+        main(workers=args.workers, seed=args.seed, islands=args.islands, island_options={
+            "migration_interval": args.migration_interval,
+            "migration_size": args.migration_size,
+            "topology": args.topology,
+        }, generations=args.generations, stopping=StoppingCriteria(
+            time_budget=args.time_budget,
+            stall_generations=args.stall_generations,
+            target_score=args.target_score,
+            stop_when_feasible=args.until_feasible,
+        ), unconstrained_share=args.unconstrained_share,
+            local_search=args.local_search, local_search_time=args.local_search_time,
+            seeded_fraction=args.seeded_fraction, room_sharing=args.room_sharing, progress=progress)
+    if args.profile:
+        progress({"type": "profile", "dept": "*", **profiler.report()})
@@ -1,23 +1,501 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List, Dict
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from pydantic import BaseModel
+from typing import List, Dict, Optional, Union
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+import gzip
+import hashlib
+import json
+import threading
 from auth_dependencies import get_current_active_user
+from problem_model import slot_index
+from rescheduling import dataset_store
+from sqlite_database import SQLiteDatabase
+from timetable_output import UNASSIGNED_PROFESSOR
 
 router = APIRouter()
 
-# In-memory storage for demo; replace with DB integration
-timetable_store = {}
+TIMETABLE_DB_PATH = "timetables.db"
+MAX_MOVES = 500
+UNCHECKED = "students, timeslots and rooms were not checked, only room and professor clashes"
 
-@router.put("/timetable/update")
-def update_timetable(dept_code: str, updated_schedule: List[Dict], current_user: dict = Depends(get_current_active_user)):
+
+# Every save adds a version; bodies are stored as gzip-compressed JSON, ready to be served.
+# dataset_id is the uploaded dataset (see rescheduling.DatasetStore) the timetable belongs to.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS timetable_versions (
+    dept_code TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    saved_at TEXT NOT NULL,
+    saved_by TEXT,
+    dataset_id TEXT,
+    etag TEXT NOT NULL,
+    classes INTEGER NOT NULL,
+    body BLOB NOT NULL,
+    PRIMARY KEY (dept_code, version)
+);
+CREATE INDEX IF NOT EXISTS timetable_versions_latest ON timetable_versions (dept_code, version, etag);
+"""
+
+
+class TimetableVersion:
+    """One saved version of a department's timetable, with its compressed and plain JSON bodies."""
+
+    def __init__(self, dept_code, version, saved_at, saved_by, dataset_id, etag, classes, body):
+        self.dept_code = dept_code
+        self.version = version
+        self.saved_at = saved_at
+        self.saved_by = saved_by
+        self.dataset_id = dataset_id
+        self.etag = etag
+        self.classes = classes
+        self.body = body
+        self._json = None
+        self._timetable = None
+
+    @property
+    def json(self):
+        if self._json is None:
+            self._json = gzip.decompress(self.body)
+        return self._json
+
+    @property
+    def timetable(self):
+        """The decoded timetable; the same list for as long as this version is cached."""
+        if self._timetable is None:
+            self._timetable = json.loads(self.json)
+        return self._timetable
+
+    def info(self):
+        return {"version": self.version, "saved_at": self.saved_at, "saved_by": self.saved_by,
+                "dataset_id": self.dataset_id, "etag": self.etag, "classes": self.classes}
+
+
+class TimetableStore:
+    """Versioned department timetables in an embedded SQLite database (see :class:`SQLiteDatabase`).
+
+    Each save adds a version. The latest version of each department
+    is cached with its body already compressed; a read only checks with an
+    indexed query that it is still the latest. Reads mirror a dict of
+    ``dept_code -> timetable``.
+    """
+
+    def __init__(self, path=TIMETABLE_DB_PATH):
+        self.db = SQLiteDatabase(path, SCHEMA)
+        self._lock = threading.Lock()
+        self._latest = {}
+
+    def _load(self, dept_code, version):
+        row = self.db.execute(
+            "SELECT dept_code, version, saved_at, saved_by, dataset_id, etag, classes, body FROM timetable_versions "
+            "WHERE dept_code = ? AND version = ?", (dept_code, version)).fetchone()
+        return TimetableVersion(*row) if row is not None else None
+
+    def _cached(self, dept_code, version):
+        cached = self._latest.get(dept_code)
+        if cached is None or cached.version != version:
+            cached = self._load(dept_code, version)
+            with self._lock:
+                current = self._latest.get(dept_code)
+                if current is None or current.version < version:
+                    self._latest[dept_code] = cached
+        return cached
+
+    def versions(self):
+        """The latest version number of every department."""
+        rows = self.db.execute(
+            "SELECT dept_code, MAX(version) FROM timetable_versions GROUP BY dept_code").fetchall()
+        return dict(rows)
+
+    def latest(self, dept_code):
+        row = self.db.execute(
+            "SELECT MAX(version) FROM timetable_versions WHERE dept_code = ?", (dept_code,)).fetchone()
+        return self._cached(dept_code, row[0]) if row[0] is not None else None
+
+    def version(self, dept_code, version=None):
+        found = self.latest(dept_code) if version is None else self._load(dept_code, version)
+        if found is None:
+            raise HTTPException(status_code=404, detail="Timetable not found")
+        return found
+
+    def history(self, dept_code):
+        rows = self.db.execute(
+            "SELECT version, saved_at, saved_by, dataset_id, etag, classes FROM timetable_versions "
+            "WHERE dept_code = ? ORDER BY version", (dept_code,)).fetchall()
+        if not rows:
+            raise HTTPException(status_code=404, detail="Timetable not found")
+        return [dict(zip(('version', 'saved_at', 'saved_by', 'dataset_id', 'etag', 'classes'), row)) for row in rows]
+
+    def save(self, dept_code, timetable, saved_by=None, base_version=None, dataset_id=None):
+        """Add ``timetable`` as the department's next version and return it.
+
+        ``base_version`` is the version the change was made against (``None``
+        for a first save); if another save got in first the change is
+        rejected with 409. ``dataset_id`` records the dataset the timetable
+        is for.
+        """
+        data = json.dumps(timetable, separators=(',', ':')).encode()
+        etag = f'W/"{hashlib.sha256(data).hexdigest()[:32]}"'
+        saved = TimetableVersion(dept_code, (base_version or 0) + 1, datetime.now(timezone.utc).isoformat(),
+                                 saved_by, dataset_id, etag, len(timetable), gzip.compress(data, compresslevel=6))
+        with self.db.transaction() as conn:
+            latest = conn.execute("SELECT MAX(version) FROM timetable_versions WHERE dept_code = ?",
+                                  (dept_code,)).fetchone()[0]
+            if latest != base_version:
+                raise HTTPException(status_code=409, detail="Timetable was changed by another save, reload it")
+            conn.execute("INSERT INTO timetable_versions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         (dept_code, saved.version, saved.saved_at, saved_by, dataset_id, etag, saved.classes,
+                          saved.body))
+        saved._timetable = timetable
+        with self._lock:
+            self._latest[dept_code] = saved
+        return saved
+
+    def get(self, dept_code, default=None):
+        latest = self.latest(dept_code)
+        return latest.timetable if latest is not None else default
+
+    def __getitem__(self, dept_code):
+        return self.version(dept_code).timetable
+
+    def __contains__(self, dept_code):
+        return self.latest(dept_code) is not None
+
+    def items(self):
+        return [(dept, self._cached(dept, version).timetable) for dept, version in sorted(self.versions().items())]
+
+
+timetable_store = TimetableStore()
+
+
+def diff_timetables(before, after):
+    """Classes added, removed and changed between two timetables, matched by course id."""
+    old = {str(entry.get('id')): entry for entry in before}
+    new = {str(entry.get('id')): entry for entry in after}
+    return {
+        "added": [entry for key, entry in new.items() if key not in old],
+        "removed": [entry for key, entry in old.items() if key not in new],
+        "changed": [{"id": entry.get('id'), "before": old[key], "after": entry}
+                    for key, entry in new.items() if key in old and old[key] != entry],
+    }
+
+
+class Move(BaseModel):
+    id: Union[int, str]
+    day: str
+    time: str
+    # Unchanged when not given
+    room: Optional[str] = None
+    professor: Optional[str] = None
+
+
+class MoveBatch(BaseModel):
+    moves: List[Move]
+    # By default a batch with any conflict is rejected as a whole
+    allow_conflicts: bool = False
+
+
+class TimetableIndex:
+    """Room, professor and student occupancy of every stored timetable, per ``(day, time)``.
+
+    Rooms and professors are indexed across departments, so edits are
+    also checked against the other departments' classes. Students,
+    timeslots and rooms come from the dataset the timetable is saved for,
+    loaded from :data:`dataset_store`; without one the edit is saved with
+    only room and professor clashes checked, and a warning. Checking a
+    move is a few dict lookups, independent of the size of the timetables.
+
+    Edits are saved to :data:`timetable_store`; departments saved
+    elsewhere (another worker) are re-indexed before the next check.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (dept, course id) -> timetable entry
+        self.entries = {}
+        self.course_depts = {}
+        # (room, day, time) / (professor, day, time) -> (dept, course id) keys
+        self.rooms = defaultdict(set)
+        self.professors = defaultdict(set)
+        # (day, time) -> student -> classes they have then
+        self.students = defaultdict(Counter)
+        self.dataset_id = None
+        self.enrolled = {}
+        self.timeslots = None
+        self.room_names = None
+        # dept -> indexed store version; STALE when the index holds an unsaved edit
+        self.versions = {}
+
+    STALE = -1
+
+    def _sync_store(self):
+        """Re-index the departments whose latest saved version is not the indexed one."""
+        latest = timetable_store.versions()
+        for dept_code in set(latest) | set(self.versions):
+            version = latest.get(dept_code)
+            if self.versions.get(dept_code) == version:
+                continue
+            for key in [key for key in self.entries if key[0] == dept_code]:
+                self._remove(key)
+            for entry in timetable_store.get(dept_code, []):
+                self._add((dept_code, str(entry.get('id'))), entry)
+            self.versions[dept_code] = version
+
+    def _save(self, dept_code, timetable, saved_by, dataset_id):
+        try:
+            saved = timetable_store.save(dept_code, timetable, saved_by, self.versions.get(dept_code), dataset_id)
+        except BaseException:
+            self.versions[dept_code] = self.STALE
+            raise
+        self.versions[dept_code] = saved.version
+        return saved
+
+    def _sync_dataset(self, dataset_id):
+        """Index the enrollments, timeslots and rooms of dataset ``dataset_id``.
+
+        Returns a warning if there is no such stored dataset; the index then
+        only checks room and professor clashes.
+        """
+        if dataset_id is not None and dataset_id == self.dataset_id:
+            return None
+        frames = None
+        if dataset_id is not None:
+            try:
+                frames = dataset_store.get(dataset_id)
+            except HTTPException:
+                pass
+        if frames is None:
+            warning = (f"No dataset to check against: {UNCHECKED}" if dataset_id is None
+                       else f"Dataset {dataset_id} is not stored: {UNCHECKED}")
+            if self.dataset_id is None:
+                return warning
+            self.enrolled, self.timeslots, self.room_names = {}, None, None
+        else:
+            warning = None
+            rooms_df, timeslots_df, enrollments_df = frames[1], frames[2], frames[6]
+            self.enrolled = {str(cid): tuple(students) for cid, students
+                             in enrollments_df.groupby('course_id')['student_id'].agg(tuple).items()}
+            self.timeslots = set(slot_index(timeslots_df))
+            self.room_names = set(rooms_df['room_name'].astype(str))
+        self.dataset_id = dataset_id if frames is not None else None
+        self.students.clear()
+        for (_, cid), entry in self.entries.items():
+            self.students[_slot(entry)].update(self.enrolled.get(cid, ()))
+        return warning
+
+    def _add(self, key, entry):
+        self.entries[key] = entry
+        self.course_depts[key[1]] = key[0]
+        day, time = _slot(entry)
+        self.rooms[(str(entry.get('room')), day, time)].add(key)
+        if _professor(entry) is not None:
+            self.professors[(_professor(entry), day, time)].add(key)
+        self.students[(day, time)].update(self.enrolled.get(key[1], ()))
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        if self.course_depts.get(key[1]) == key[0]:
+            del self.course_depts[key[1]]
+        day, time = _slot(entry)
+        self.rooms[(str(entry.get('room')), day, time)].discard(key)
+        if _professor(entry) is not None:
+            self.professors[(_professor(entry), day, time)].discard(key)
+        self.students[(day, time)].subtract(self.enrolled.get(key[1], ()))
+        return entry
+
+    def _conflicts(self, key, entry):
+        """Clashes of ``entry`` with the indexed classes, ``entry`` itself not being indexed."""
+        day, time = _slot(entry)
+        found = []
+        clashes = (('room', str(entry.get('room')), self.rooms), ('professor', _professor(entry), self.professors))
+        for kind, name, index in clashes:
+            others = index.get((name, day, time)) if name is not None else None
+            if others:
+                found.append({"type": kind, kind: name, **_describe(key, entry),
+                              "with": [{"dept_code": dept, "id": self.entries[(dept, cid)].get('id')}
+                                       for dept, cid in sorted(others)]})
+        busy = self.students.get((day, time))
+        if busy:
+            students = sum(1 for student in self.enrolled.get(key[1], ()) if busy[student] > 0)
+            if students:
+                found.append({"type": "student", "students": students, **_describe(key, entry)})
+        return found
+
+    def replace(self, dept_code, timetable, strict=False, saved_by=None, dataset_id=None):
+        """Save a department's whole timetable as a new version, for dataset ``dataset_id``.
+
+        Returns the saved :class:`TimetableVersion`, the conflicts, each
+        clash reported once, and a warning if the dataset was not available
+        to check against. With ``strict`` a timetable with conflicts is
+        rejected with 409 and the previous one kept.
+        """
+        with self._lock:
+            warning = self._sync_dataset(dataset_id)
+            self._sync_store()
+            previous = [self._remove(key) for key in [key for key in self.entries if key[0] == dept_code]]
+            conflicts = []
+            for entry in timetable:
+                key = (dept_code, str(entry.get('id')))
+                conflicts += self._conflicts(key, entry)
+                self._add(key, entry)
+            if conflicts and strict:
+                for entry in timetable:
+                    self._remove((dept_code, str(entry.get('id'))))
+                for entry in previous:
+                    self._add((dept_code, str(entry.get('id'))), entry)
+                raise HTTPException(status_code=409, detail={"message": "Timetable has conflicts",
+                                                             "conflicts": conflicts})
+            return self._save(dept_code, timetable, saved_by, dataset_id), conflicts, warning
+
+    def conflicts(self, dept_code):
+        """Every current clash involving a class of ``dept_code``."""
+        with self._lock:
+            self._sync_store()
+            keys = [key for key in self.entries if key[0] == dept_code]
+            if not keys:
+                raise HTTPException(status_code=404, detail="Timetable not found")
+            self._sync_dataset(timetable_store.version(dept_code).dataset_id)
+            found = []
+            for key in keys:
+                entry = self._remove(key)
+                found += self._conflicts(key, entry)
+                self._add(key, entry)
+            return found
+
+    def department(self, course_id):
+        with self._lock:
+            self._sync_store()
+        dept_code = self.course_depts.get(str(course_id))
+        if dept_code is None:
+            raise HTTPException(status_code=404, detail=f"Course {course_id} is not in any stored timetable")
+        return dept_code
+
+    def _check(self, dept_code, move):
+        if (dept_code, str(move.id)) not in self.entries:
+            raise HTTPException(status_code=404, detail=f"Course {move.id} is not in the {dept_code} timetable")
+        if self.timeslots is not None and (move.day, move.time) not in self.timeslots:
+            raise HTTPException(status_code=400, detail=f"Unknown timeslot: {move.day} {move.time}")
+        if self.room_names is not None and move.room is not None and move.room not in self.room_names:
+            raise HTTPException(status_code=400, detail=f"Unknown room: {move.room}")
+
+    def move(self, dept_code, moves, allow_conflicts=False, saved_by=None):
+        """Apply ``moves`` in order, all or none of them.
+
+        Each move is checked against the timetables as left by the moves
+        before it. Unless ``allow_conflicts``, a batch with any conflict is
+        rolled back and rejected with 409. Applied moves are saved as a new
+        version of the department's timetable, for the same dataset.
+        """
+        with self._lock:
+            self._sync_store()
+            base = timetable_store.version(dept_code)
+            warning = self._sync_dataset(base.dataset_id)
+            for move in moves:
+                self._check(dept_code, move)
+            applied, conflicts = [], []
+            for move in moves:
+                key = (dept_code, str(move.id))
+                old = self._remove(key)
+                changes = move.model_dump(include={'day', 'time', 'room', 'professor'}, exclude_none=True)
+                entry = {**old, **changes}
+                conflicts += self._conflicts(key, entry)
+                self._add(key, entry)
+                applied.append((key, old))
+            if conflicts and not allow_conflicts:
+                for key, old in reversed(applied):
+                    self._remove(key)
+                    self._add(key, old)
+                raise HTTPException(status_code=409, detail={"message": "Moves conflict with the timetable",
+                                                             "conflicts": conflicts})
+            timetable = [self.entries[(dept_code, str(entry.get('id')))] for entry in base.timetable]
+            saved = self._save(dept_code, timetable, saved_by, base.dataset_id)
+            result = {"applied": len(applied), "version": saved.version, "conflicts": conflicts}
+            if warning:
+                result["warning"] = warning
+            return result
+
+
+def _slot(entry):
+    return str(entry.get('day')), str(entry.get('time'))
+
+
+def _professor(entry):
+    professor = entry.get('professor')
+    return None if professor is None or str(professor) == UNASSIGNED_PROFESSOR else str(professor)
+
+
+def _describe(key, entry):
+    return {"dept_code": key[0], "id": entry.get('id'), "day": entry.get('day'), "time": entry.get('time')}
+
+
+timetable_index = TimetableIndex()
+
+def _check_role(current_user):
     if current_user["role"] not in ["admin", "teacher"]:
         raise HTTPException(status_code=403, detail="Not authorized to update timetable")
 
-    timetable_store[dept_code] = updated_schedule
-    return {"message": "Timetable updated successfully"}
+@router.put("/timetable/update")
+def update_timetable(dept_code: str, updated_schedule: List[Dict], strict: bool = False,
+                     dataset_id: Optional[str] = None, current_user: dict = Depends(get_current_active_user)):
+    # dataset_id is the one from the upload job that made the timetable; it is checked against that dataset
+    _check_role(current_user)
+    ids = [str(entry.get('id')) for entry in updated_schedule]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="A course appears more than once in the timetable")
+    saved, conflicts, warning = timetable_index.replace(dept_code, updated_schedule, strict,
+                                                        current_user["username"], dataset_id)
+    result = {"message": "Timetable updated successfully", "version": saved.version, "dataset_id": dataset_id,
+              "conflicts": conflicts}
+    if warning:
+        result["warning"] = warning
+    return result
+
+@router.post("/timetable/{dept_code}/moves")
+def move_classes(dept_code: str, batch: MoveBatch, current_user: dict = Depends(get_current_active_user)):
+    _check_role(current_user)
+    if len(batch.moves) > MAX_MOVES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_MOVES} moves per batch")
+    return timetable_index.move(dept_code, batch.moves, batch.allow_conflicts, current_user["username"])
+
+@router.post("/update_timetable")
+def move_class(move: Move, current_user: dict = Depends(get_current_active_user)):
+    # Single drag-and-drop move from the timetable grid, which does not send the department
+    _check_role(current_user)
+    return timetable_index.move(timetable_index.department(move.id), [move], saved_by=current_user["username"])
+
+@router.get("/timetable/{dept_code}/conflicts")
+def get_conflicts(dept_code: str, current_user: dict = Depends(get_current_active_user)):
+    return timetable_index.conflicts(dept_code)
+
+@router.get("/timetable/{dept_code}/versions")
+def get_versions(dept_code: str, current_user: dict = Depends(get_current_active_user)):
+    return timetable_store.history(dept_code)
+
+@router.get("/timetable/{dept_code}/diff")
+def get_diff(dept_code: str, from_version: Optional[int] = None, to_version: Optional[int] = None,
+             current_user: dict = Depends(get_current_active_user)):
+    # Defaults to the latest version against the one before it
+    after = timetable_store.version(dept_code, to_version)
+    before = timetable_store.version(dept_code, from_version if from_version is not None else after.version - 1)
+    return {"dept_code": dept_code, "from_version": before.version, "to_version": after.version,
+            **diff_timetables(before.timetable, after.timetable)}
+
+def _etag_matches(if_none_match, etag):
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: the gzip and plain bodies are the same timetable
+    return etag.removeprefix("W/") in {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
 
 @router.get("/timetable/{dept_code}")
-def get_timetable(dept_code: str, current_user: dict = Depends(get_current_active_user)):
-    schedule = timetable_store.get(dept_code)
-    if not schedule:
-        raise HTTPException(status_code=404, detail="Timetable not found")
-    return schedule
+def get_timetable(dept_code: str, request: Request, version: Optional[int] = None,
+                  current_user: dict = Depends(get_current_active_user)):
+    saved = timetable_store.version(dept_code, version)
+    # Clients poll with If-None-Match; unchanged timetables cost an indexed lookup and a 304
+    headers = {"ETag": saved.etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding, Authorization"}
+    if _etag_matches(request.headers.get("if-none-match"), saved.etag):
+        return Response(status_code=304, headers=headers)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        return Response(saved.body, media_type="application/json", headers={**headers, "Content-Encoding": "gzip"})
+    return Response(saved.json, media_type="application/json", headers=headers)
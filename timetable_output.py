@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+OUTPUT_COLUMNS = ['day', 'time', 'id', 'name', 'professor', 'room']
+# Professor shown for classes without one
+UNASSIGNED_PROFESSOR = "NA"
+# Hour of the first period; the grid has a row per hour from here
+FIRST_HOUR = 9
+GRID_PERIODS = 6
+
+
+class _Lookup:
+    """Vectorized id -> attribute lookup over one table (the first row wins for a repeated id)."""
+
+    def __init__(self, df, key, *columns):
+        df = df.drop_duplicates(key)
+        self.table = key
+        self.index = pd.Index(df[key].to_numpy())
+        self.values = {column: df[column].astype(str).to_numpy(dtype=object) for column in columns}
+
+    def positions(self, ids, missing_ok=False):
+        positions = self.index.get_indexer(np.asarray(ids, dtype=object))
+        if not missing_ok and (positions < 0).any():
+            unknown = sorted({str(i) for i, p in zip(ids, positions) if p < 0})
+            raise KeyError(f"Unknown {self.table} in timetable: {', '.join(unknown[:5])}")
+        return positions
+
+
+class TimetableFormatter:
+    """Turns decoded timetables into the API's JSON rows and the CLI's day/period grid.
+
+    The id -> name lookups are built once from the input tables, so each
+    timetable is formatted with a handful of array lookups instead of a
+    DataFrame scan per class. Build one per dataset and reuse it for every
+    department.
+    """
+
+    def __init__(self, courses_df, rooms_df, timeslots_df, professors_df):
+        self.courses = _Lookup(courses_df, 'course_id', 'course_name')
+        self.rooms = _Lookup(rooms_df, 'room_id', 'room_name')
+        self.timeslots = _Lookup(timeslots_df, 'timeslot_id', 'day', 'start_time')
+        self.professors = _Lookup(professors_df, 'professor_id', 'name')
+        self.days = list(pd.unique(timeslots_df['day'].astype(str)))
+
+    def columns(self, schedule):
+        """``OUTPUT_COLUMNS`` as arrays, one entry per ``(course_id, timeslot_id, room_id, professor_id)`` gene.
+
+        Classes without a professor get :data:`UNASSIGNED_PROFESSOR`.
+        """
+        if not schedule:
+            return {column: np.empty(0, dtype=object) for column in OUTPUT_COLUMNS}
+        course_ids, timeslot_ids, room_ids, professor_ids = zip(*schedule)
+        slots = self.timeslots.positions(timeslot_ids)
+        profs = self.professors.positions(professor_ids, missing_ok=True)
+        return {
+            'day': self.timeslots.values['day'][slots],
+            'time': self.timeslots.values['start_time'][slots],
+            'id': np.array(course_ids, dtype=object),
+            'name': self.courses.values['course_name'][self.courses.positions(course_ids)],
+            'professor': np.where(profs >= 0, self.professors.values['name'][profs], UNASSIGNED_PROFESSOR),
+            'room': self.rooms.values['room_name'][self.rooms.positions(room_ids)],
+        }
+
+    def records(self, schedule):
+        """The timetable as JSON-ready dicts with ``OUTPUT_COLUMNS`` keys."""
+        columns = self.columns(schedule)
+        return [dict(zip(OUTPUT_COLUMNS, row)) for row in zip(*(columns[c].tolist() for c in OUTPUT_COLUMNS))]
+
+    def grid(self, schedule):
+        """The timetable pivoted into periods x days, each cell listing its classes.
+
+        Rows are hourly periods from :data:`FIRST_HOUR`, at least
+        :data:`GRID_PERIODS` of them; columns are the days in timeslot order.
+        """
+        columns = self.columns(schedule)
+        period = pd.Series(columns['time']).str.split(':').str[0].astype(int) - FIRST_HOUR
+        n_periods = max(GRID_PERIODS, int(period.max()) + 1 if len(period) else 0)
+        cells = pd.Series([f"{name} ({room}, {prof})" for name, room, prof
+                           in zip(columns['name'], columns['room'], columns['professor'])], dtype=object)
+        grid = (cells.groupby([period.rename('period'), pd.Series(columns['day'], name='day')], sort=False)
+                .agg(", ".join).unstack('day'))
+        grid = grid.reindex(index=range(n_periods), columns=self.days).fillna("").astype(str)
+        grid.index = [f"Period {i + 1}" for i in range(n_periods)]
+        grid.columns.name = None
+        return grid
@@ -0,0 +1,86 @@
+import numpy as np
+
+from problem_model import NO_PROFESSOR
+
+# Upper bound on the number of (individual, enrollment) pairs scored at once,
+# keeps the student-clash term from allocating population x enrollments in one go.
+MAX_CHUNK_ELEMENTS = 4_000_000
+
+
+def population_to_array(population):
+    """Stack a list of timetables into an int array of shape (population, courses, 3)."""
+    return np.asarray(population, dtype=np.int64).reshape(len(population), -1, 3)
+
+
+def _duplicates_per_row(keys):
+    """Count, per row, how many entries repeat an earlier entry of the same row."""
+    if keys.shape[1] < 2:
+        return np.zeros(keys.shape[0], dtype=np.int64)
+    keys = np.sort(keys, axis=1)
+    return (keys[:, 1:] == keys[:, :-1]).sum(axis=1)
+
+
+def _student_duplicates(model, timeslots):
+    n_enroll = len(model.enroll_course)
+    if n_enroll == 0:
+        return np.zeros(timeslots.shape[0], dtype=np.int64)
+    rows = max(1, MAX_CHUNK_ELEMENTS // n_enroll)
+    base = model.enroll_student * model.n_timeslots
+    out = []
+    for start in range(0, timeslots.shape[0], rows):
+        keys = base[None, :] + timeslots[start:start + rows][:, model.enroll_course]
+        out.append(_duplicates_per_row(keys))
+    return np.concatenate(out)
+
+
+def batch_fitness(model, pop):
+    """Score every timetable in ``pop`` at once.
+
+    ``pop`` is an int array of shape (population, courses, 3) holding
+    (timeslot, room, professor) per course. Returns an int64 array of scores
+    identical to calling ``ga_engine.fitness`` on each timetable.
+    """
+    n_pop, n_courses = pop.shape[0], pop.shape[1]
+    if n_courses == 0:
+        return np.zeros(n_pop, dtype=np.int64)
+
+    n_timeslots = model.n_timeslots
+    ts, room, prof = pop[:, :, 0], pop[:, :, 1], pop[:, :, 2]
+    courses = np.arange(n_courses)
+    score = np.zeros(n_pop, dtype=np.int64)
+
+    # Room type/capacity: +1 when valid, -5 otherwise
+    room_ok = model.room_ok[courses[None, :], room]
+    score += np.where(room_ok, 1, -5).sum(axis=1)
+
+    # Room double-booking: +2 for the first use of a (room, timeslot), -10 for each repeat.
+    # Using a slot reserved by another department is always a repeat.
+    reserved = model.room_reserved[room, ts]
+    room_keys = np.where(reserved, -1 - courses[None, :], room * n_timeslots + ts)
+    room_dup = _duplicates_per_row(room_keys) + reserved.sum(axis=1)
+    score += 2 * (n_courses - room_dup) - 10 * room_dup
+
+    # Professor availability, clashes and load
+    has_prof = prof != NO_PROFESSOR
+    safe_prof = np.where(has_prof, prof, 0)
+    score += np.where(has_prof, 2, -5).sum(axis=1)
+    if model.n_professors:
+        unavailable = has_prof & ~model.prof_available[safe_prof, ts]
+        score -= 10 * unavailable.sum(axis=1)
+
+        # Genes without a professor get unique negative keys so they never clash
+        prof_keys = np.where(has_prof, safe_prof * n_timeslots + ts, -1 - courses[None, :])
+        score -= 15 * _duplicates_per_row(prof_keys)
+
+        flat = (np.arange(n_pop)[:, None] * model.n_professors + safe_prof)[has_prof]
+        load = np.bincount(flat, minlength=n_pop * model.n_professors)
+        load = load.reshape(n_pop, model.n_professors)
+        excess = np.where(load > 0, np.maximum(load - model.prof_max_load[None, :], 0), 0)
+        score -= 10 * excess.sum(axis=1)
+
+    # Student clashes: -15 for each extra course a student has in the same timeslot
+    score -= 15 * _student_duplicates(model, ts)
+
+    # Preferred timeslots: +3
+    score += 3 * model.course_preferred[courses[None, :], ts].sum(axis=1)
+    return score